@@ -1,19 +1,41 @@
-import pygame
-import bresenham
 import random
 import logging
 import os
+import re
 import json
-from dataclasses import dataclass
-from enum import IntEnum
+import time
+import heapq
+import struct
+import zlib
+import argparse
+import functools
+import multiprocessing
+import queue
+import tempfile
+import threading
+import concurrent.futures
+from array import array
+from collections import OrderedDict
+from dataclasses import dataclass, astuple
+from enum import IntEnum, IntFlag
+
+try:
+    import pygame
+except ImportError:  # optional: only the Game/PyGameCanvas front end needs it
+    pygame = None
+
+try:
+    import numpy as np
+except ImportError:  # optional: enables the vectorized NumpyArena backend
+    np = None
 
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class LevelConfig:
-    """Configuration for a single game level."""
+    """Configuration for a single game level. Frozen, so it can be hashed and used as a cache key."""
     level_number: int
     fill_percent: float         # fraction of arena that must be filled to complete the level
     arena_width: int            # arena grid width in cells
@@ -28,7 +50,7 @@ class LevelConfig:
     fuse_delay: int = 10        # number of player path cells before fuse starts moving
 
 
-@dataclass
+@dataclass(slots=True)
 class GameConfig:
     """Top-level display and game settings."""
     max_window_width: int = 800
@@ -36,10 +58,19 @@ class GameConfig:
     margin: int = 10
     hud_height: int = 32
     starting_lives: int = 3
-    fps: int = 60
+    fps: int = 60                 # simulation ticks per second; all speeds are counted in ticks
+    max_fps: int = 0              # render frame cap (0 = uncapped)
+    max_catch_up_ticks: int = 5   # most ticks run per rendered frame before the game slows down instead
     invincibility_seconds: float = 2.0
     high_score_file: str = "pystix_highscore.json"
     preferred_cell_size: int = 5  # target pixels per cell; shrinks only if arena exceeds max window
+    arena_backend: str = 'auto'   # 'python', 'numpy', or 'auto' (numpy when installed)
+    swarm_size: int = 0           # stress mode: extra line and arena enemies on every level
+    seed: int | None = None       # RNG seed for a reproducible game (None = a new seed each run)
+    replay_file: str = "pystix_last_game.replay"  # where the last game's inputs are recorded ('' = off)
+    save_file: str = "pystix_save.bin"  # in-progress game, resumable from the title screen ('' = off)
+    autosave_seconds: float = 30.0      # save the game in progress this often, and on quit
+    dirty_rects: bool = True      # redraw and update only the screen areas that changed while playing
 
 
 class GameState(IntEnum):
@@ -49,23 +80,103 @@ class GameState(IntEnum):
     GAME_OVER = 3
 
 
+class Action(IntFlag):
+    """Player input for one Simulation step; combine with |."""
+    NONE = 0
+    UP = 1
+    DOWN = 2
+    LEFT = 4
+    RIGHT = 8
+    DRAW = 16
+
+
+class EventType(IntEnum):
+    """Things that happen during a Simulation step. Event.data holds:
+    - LINE_DRAWN: (x0, y0, x1, y1), one step of the player's path
+    - ARENA_FILLED: (spans, was_filled), the (y, x_start, x_end) spans filled when a path completed
+    - STICKS_MOVED: (), the arena enemies moved
+    - PLAYER_DIED: (x, y, cause), cause is 'drawing', 'line_enemy', 'arena_enemy' or 'fuse'
+    - PLAYER_RESPAWNED: ()
+    - LEVEL_COMPLETE: (filled_percent, excess_bonus, lives_bonus)
+    - GAME_OVER: (score,)
+    """
+    LINE_DRAWN = 0
+    ARENA_FILLED = 1
+    STICKS_MOVED = 2
+    PLAYER_DIED = 3
+    PLAYER_RESPAWNED = 4
+    LEVEL_COMPLETE = 5
+    GAME_OVER = 6
+
+
+@dataclass(frozen=True, slots=True)
+class Event:
+    """One EventType with its data tuple."""
+    type: EventType
+    data: tuple = ()
+
+
+class RandomStreams(object):
+    """Seeded random.Random streams, one per subsystem, so that e.g. spawning a fuse
+    or an explosion never shifts the enemy AI's random sequence. The same seed gives
+    the same streams, and so the same game for the same inputs. Seeds are unsigned
+    64-bit integers, as replays and snapshots store them."""
+    __slots__ = ('seed', 'level', 'enemies', 'fuse', 'effects')
+    MAX_SEED = (1 << 64) - 1
+
+    def __init__(self, seed=None):
+        if seed is None:
+            seed = random.randrange(1 << 32)  # follows random.seed() when nothing else is given
+        elif not 0 <= seed <= self.MAX_SEED:
+            raise ValueError(f"seed must be between 0 and {self.MAX_SEED}, not {seed}")
+        self.seed = seed
+        self.level = self.stream('level')        # LevelGenerator archetypes
+        self.enemies = self.stream('enemies')    # enemy placement, velocities and turns
+        self.fuse = self.stream('fuse')          # fuse spawning
+        self.effects = self.stream('effects')    # cosmetic effects such as explosions
+
+    def stream(self, name):
+        """Return a new random.Random seeded from the seed and the stream name."""
+        return random.Random(f"{self.seed}:{name}")
+
+
 ARCHETYPES = ['open', 'crowded', 'edge_hell', 'fuse_panic']
 
 
 class LevelGenerator:
     """Generates infinite procedural levels using base difficulty scaling + archetype modifiers."""
 
-    def __init__(self):
+    def __init__(self, swarm_size=0, rng=None):
         self.last_archetypes = []
+        self.swarm_size = swarm_size
+        self.rng = rng if rng is not None else random
 
     def reset(self):
         self.last_archetypes = []
 
+    def levels(self, start=1):
+        """Lazily generate the configs for levels start, start+1, ... in order."""
+        level = start
+        while True:
+            yield self.build_level(level)
+            level += 1
+
+    @classmethod
+    def stream(cls, seed, swarm_size=0):
+        """Lazily generate the levels of a game with this seed: the same configs a
+        Simulation seeded with it plays, in order."""
+        return cls(swarm_size, RandomStreams(seed).level).levels()
+
     def build_level(self, level):
         """Generate a LevelConfig for the given level number (1-based)."""
         config = self._generate_base(level)
         archetype = self._choose_archetype(level)
         config = self._apply_archetype(config, archetype)
+        if self.swarm_size:
+            from dataclasses import replace
+            config = replace(config,
+                             num_line_enemies=config.num_line_enemies + self.swarm_size,
+                             num_arena_enemies=config.num_arena_enemies + self.swarm_size)
         self.last_archetypes.append(archetype)
         logger.debug("Level %d: archetype=%s, arena=%dx%d, fill=%.0f%%, "
                      "line_enemies=%d, arena_enemies=%d, fuse_chance=%.0f%%",
@@ -141,7 +252,7 @@ class LevelGenerator:
 
         # Anti-repetition: avoid 3 of the same archetype in a row
         for _ in range(10):
-            choice = random.choice(pool)
+            choice = self.rng.choice(pool)
             if (len(self.last_archetypes) >= 2
                     and self.last_archetypes[-1] == self.last_archetypes[-2] == choice):
                 continue
@@ -149,7 +260,7 @@ class LevelGenerator:
         # Fallback: pick any archetype that isn't the repeated one
         blocked = self.last_archetypes[-1] if self.last_archetypes else None
         fallback = [a for a in pool if a != blocked]
-        return random.choice(fallback) if fallback else random.choice(pool)
+        return self.rng.choice(fallback) if fallback else self.rng.choice(pool)
 
     def _apply_archetype(self, config, archetype):
         """Apply archetype modifiers to a base config. Returns a new LevelConfig."""
@@ -191,6 +302,41 @@ class CellState(IntEnum):
     _TEMP_REGION = 4
 
 
+# Raw cell codes as stored in Arena.cells; hot paths compare against these
+# plain ints rather than going through the CellState enum.
+_FREE = int(CellState.FREE)
+_WALL = int(CellState.WALL)
+_DRAWING = int(CellState.DRAWING)
+_FILLED = int(CellState.FILLED)
+_TEMP_REGION = int(CellState._TEMP_REGION)
+
+# Runs of FREE cells in the raw buffer, and the translation that releases the
+# _TEMP_REGION cells marked as kept back to FREE
+_FREE_RUN = re.compile(re.escape(bytes((_FREE,))) + b'+')
+_RELEASE_TEMP_REGION = bytes.maketrans(bytes((_TEMP_REGION,)), bytes((_FREE,)))
+
+# Runs of any one repeated cell code, for run-length encoding the buffer (an
+# alternation of the known codes is several times faster than a backreference)
+_CELL_RUN = re.compile(b'|'.join(re.escape(bytes((code,))) + b'+' for code in range(_TEMP_REGION + 1)))
+
+# 1 for the codes that count towards Arena.filled_percent (WALL and FILLED), indexed by code
+_COUNTS_AS_FILLED = bytes(1 if code in (_WALL, _FILLED) else 0 for code in range(256))
+
+# 1 for the codes line enemies can walk on (WALL and DRAWING), indexed by code
+_WALKABLE = bytes(1 if code in (_WALL, _DRAWING) else 0 for code in range(256))
+
+# LineEnemy directions 0-3 as (dx, dy); direction d is bit 1 << d of Arena._walk_mask
+_DIRECTION_DELTAS = ((1, 0), (-1, 0), (0, 1), (0, -1))
+_OPPOSITE_DIRECTION = (1, 0, 3, 2, None)
+
+# Directions a line enemy may turn to, indexed by [current direction][walk mask]:
+# every walkable direction except straight back, in direction order
+_LINE_ENEMY_CHOICES = tuple(
+    tuple(tuple(d for d in range(4) if mask & (1 << d) and d != _OPPOSITE_DIRECTION[current])
+          for mask in range(16))
+    for current in range(5))
+
+
 class MoveResult(IntEnum):
     """Result of a player movement attempt."""
     DIED = -1
@@ -199,22 +345,42 @@ class MoveResult(IntEnum):
 
 
 class Path(object):
-    """Track the positions that are being drawn by the Player."""
+    """Track the positions that are being drawn by the Player.
+
+    Coordinates are kept in two array('H') columns, so len() and path[i] need no
+    copies. The DRAWING cells' straight runs, which collision uses, are indexed by the
+    Arena (see _DrawingRuns)."""
+    __slots__ = ('xs', 'ys')
+
     def __init__(self):
         self.reset()
 
     def reset(self):
-        self.positions = []
+        self.xs = array('H')
+        self.ys = array('H')
 
     def add_position(self, x, y):
-        self.positions.append((x, y))
+        self.xs.append(x)
+        self.ys.append(y)
+
+    def __len__(self):
+        return len(self.xs)
+
+    def __getitem__(self, i):
+        return self.xs[i], self.ys[i]
+
+    def __iter__(self):
+        return zip(self.xs, self.ys)
 
     def get_positions(self):
-        return self.positions
+        """Return the positions as a new list of (x, y) tuples."""
+        return list(zip(self.xs, self.ys))
 
 
 class Player(object):
     """The Player."""
+    __slots__ = ('arena', 'start_pos', 'path', 'x', 'y', 'is_drawing', 'drawing_completed')
+
     def __init__(self, arena, x, y):
         self.arena = arena
         self.start_pos = (x, y)
@@ -230,25 +396,26 @@ class Player(object):
         """Attempt to move the player by (dx, dy).
         Returns MoveResult.OK if successful, MoveResult.BLOCKED if not,
         and MoveResult.DIED if player moved into a drawing line."""
+        arena = self.arena
         nx, ny = self.x + dx, self.y + dy
-        if nx < 0 or nx >= self.arena.arena_width or ny < 0 or ny >= self.arena.arena_height:
+        if nx < 0 or nx >= arena.arena_width or ny < 0 or ny >= arena.arena_height:
             return MoveResult.BLOCKED
-        cell = self.arena.get_cell(nx, ny)
+        cell = arena.cells[ny * arena.arena_width + nx]
         if self.is_drawing:
-            if cell == CellState.FREE:
+            if cell == _FREE:
                 self.path.add_position(nx, ny)
-                self.arena.set_cell(nx, ny, CellState.DRAWING)
+                arena.set_cell(nx, ny, _DRAWING)
                 self.x, self.y = nx, ny
                 return MoveResult.OK
-            elif cell == CellState.WALL and len(self.path.get_positions()) > 2:
+            elif cell == _WALL and len(self.path) > 2:
                 self.drawing_completed = True
                 self.x, self.y = nx, ny
                 return MoveResult.OK
-            elif cell == CellState.DRAWING:
+            elif cell == _DRAWING:
                 logger.debug("Player moved into drawing line")
                 return MoveResult.DIED
         else:
-            if cell == CellState.WALL:
+            if cell == _WALL:
                 self.x, self.y = nx, ny
                 return MoveResult.OK
         return MoveResult.BLOCKED
@@ -276,128 +443,322 @@ class Player(object):
         return False
 
 
-class ArenaEnemy(object):
-    """A pile of sticks that move around the arena. If the sticks hit a line that's being drawn, life is lost."""
+def _swarm_field(name):
+    """Property that reads and writes this enemy's slot in its swarm's `name` list."""
+    def get(self):
+        return getattr(self.swarm, name)[self.index]
+
+    def set(self, value):
+        getattr(self.swarm, name)[self.index] = value
+    return property(get, set)
+
+
+def _stick_hit(cells, w, x1, y1, x2, y2):
+    """Return the first cell code that is not FREE on the stick from (x1, y1) to (x2, y2),
+    or FREE if there is none. Walks the Bresenham line (both endpoints included) as
+    offsets into the cell buffer."""
+    dx = x2 - x1
+    dy = y2 - y1
+    step_x = 1 if dx > 0 else -1
+    step_y = w if dy > 0 else -w
+    dx = abs(dx)
+    dy = abs(dy)
+    if dx > dy:
+        major_step, minor_step = step_x, step_y
+    else:
+        dx, dy = dy, dx
+        major_step, minor_step = step_y, step_x
+    i = y1 * w + x1
+    error = 2 * dy - dx
+    for _ in range(dx + 1):
+        cell = cells[i]
+        if cell != _FREE:
+            return cell
+        if error >= 0:
+            i += minor_step
+            error -= 2 * dx
+        error += 2 * dy
+        i += major_step
+    return _FREE
+
+
+def _box_is_free(cells, w, h, left, top, right, bottom):
+    """Return True if the box (left, top)-(right, bottom) lies inside the arena and all
+    of its cells are FREE. `cells` is the arena's bytearray; each row is one C-level count."""
+    if left < 0 or top < 0 or right >= w or bottom >= h:
+        return False
+    width = right - left + 1
+    for row_start in range(top * w + left, bottom * w + left + 1, w):
+        if cells.count(_FREE, row_start, row_start + width) != width:
+            return False
+    return True
+
+
+class ArenaEnemySwarm(object):
+    """State of a group of arena enemies (sticks) in parallel lists, one slot per enemy,
+    advanced together by step(). ArenaEnemy objects are views onto single slots."""
+    __slots__ = ('arena', 'end1_x', 'end1_y', 'end2_x', 'end2_y', 'vel1_x', 'vel1_y',
+                 'vel2_x', 'vel2_y', 'count1', 'count2', 'intersected')
+    DIRECTIONS = [(1,0),(1,1),(0,1),(-1,0),(-1,-1),(0,-1),(1,-1),(-1,1),(0,0)]
+
     def __init__(self, arena):
         self.arena = arena
+        self.end1_x = []
+        self.end1_y = []
+        self.end2_x = []
+        self.end2_y = []
+        self.vel1_x = []
+        self.vel1_y = []
+        self.vel2_x = []
+        self.vel2_y = []
+        self.count1 = []
+        self.count2 = []
+        self.intersected = []
+
+    def __len__(self):
+        return len(self.end1_x)
+
+    def add(self, end1_x, end1_y, end2_x, end2_y, vel1, vel2, count1=5, count2=5):
+        """Append an enemy and return its slot index."""
+        self.end1_x.append(end1_x)
+        self.end1_y.append(end1_y)
+        self.end2_x.append(end2_x)
+        self.end2_y.append(end2_y)
+        self.vel1_x.append(vel1[0])
+        self.vel1_y.append(vel1[1])
+        self.vel2_x.append(vel2[0])
+        self.vel2_y.append(vel2[1])
+        self.count1.append(count1)
+        self.count2.append(count2)
+        self.intersected.append(False)
+        return len(self.end1_x) - 1
+
+    def step(self, start=0, stop=None):
+        """Move the enemies in slots start..stop-1 one step each.
+
+        Each endpoint moves one axis at a time; a move is refused if the new cell is not
+        FREE or the stick would then cover a cell that is not FREE, and the enemy picks
+        new velocities when either countdown runs out. `intersected[i]` is set when the
+        stick ran into the player's drawing, either while trying a move or where it
+        comes to rest."""
+        arena = self.arena
+        cells = arena.cells
+        free_cells = arena._cells
+        w = arena.arena_width
+        h = arena.arena_height
+        choice = arena.rng.choice
+        randint = arena.rng.randint
+        directions = self.DIRECTIONS
+        if stop is None:
+            stop = len(self.end1_x)
+        for i in range(start, stop):
+            x1, y1 = self.end1_x[i], self.end1_y[i]
+            x2, y2 = self.end2_x[i], self.end2_y[i]
+            v1x, v1y = self.vel1_x[i], self.vel1_y[i]
+            v2x, v2y = self.vel2_x[i], self.vel2_y[i]
+            count1 = self.count1[i] - 1
+            intersected = False
+            if count1 < 0:
+                v1x, v1y = choice(directions)
+                v2x, v2y = choice(directions)
+                count1 = randint(5, 100)
+            count2 = self.count2[i] - 1
+            if count2 < 0:
+                v1x, v1y = choice(directions)
+                v2x, v2y = choice(directions)
+                count2 = randint(5, 100)
+
+            # Every stick tried below lies in the current one's box grown by a cell, so
+            # if that box is all FREE every move succeeds without rasterising anything
+            if _box_is_free(free_cells, w, h, min(x1, x2) - 1, min(y1, y2) - 1,
+                            max(x1, x2) + 1, max(y1, y2) + 1):
+                x1, y1 = x1 + v1x, y1 + v1y
+                x2, y2 = x2 + v2x, y2 + v2y
+            else:
+                # Try the four axis moves in turn: end1 x, end1 y, end2 x, end2 y
+                nx = x1 + v1x
+                hit = (_stick_hit(cells, w, nx, y1, x2, y2)
+                       if 0 <= nx < w and cells[y1 * w + nx] == _FREE else _WALL)
+                if hit == _FREE:
+                    x1 = nx
+                else:
+                    intersected = intersected or hit == _DRAWING
+                    v1x = 0
+                    count1 = 0
+                ny = y1 + v1y
+                hit = (_stick_hit(cells, w, x1, ny, x2, y2)
+                       if 0 <= ny < h and cells[ny * w + x1] == _FREE else _WALL)
+                if hit == _FREE:
+                    y1 = ny
+                else:
+                    intersected = intersected or hit == _DRAWING
+                    v1y = 0
+                    count1 = 0
+                nx = x2 + v2x
+                hit = (_stick_hit(cells, w, x1, y1, nx, y2)
+                       if 0 <= nx < w and cells[y2 * w + nx] == _FREE else _WALL)
+                if hit == _FREE:
+                    x2 = nx
+                else:
+                    intersected = intersected or hit == _DRAWING
+                    v2x = 0
+                    count2 = 0
+                ny = y2 + v2y
+                hit = (_stick_hit(cells, w, x1, y1, x2, ny)
+                       if 0 <= ny < h and cells[ny * w + x2] == _FREE else _WALL)
+                if hit == _FREE:
+                    y2 = ny
+                else:
+                    intersected = intersected or hit == _DRAWING
+                    v2y = 0
+                    count2 = 0
+                if intersected:
+                    logger.debug("Line intersected with drawing")
+                # The player may have drawn across the stick where it now rests
+                elif arena.stick_touches_path(x1, y1, x2, y2):
+                    logger.debug("Player drawing crossed the stick")
+                    intersected = True
+
+            self.end1_x[i], self.end1_y[i] = x1, y1
+            self.end2_x[i], self.end2_y[i] = x2, y2
+            self.vel1_x[i], self.vel1_y[i] = v1x, v1y
+            self.vel2_x[i], self.vel2_y[i] = v2x, v2y
+            self.count1[i], self.count2[i] = count1, count2
+            self.intersected[i] = intersected
+
+
+class ArenaEnemy(object):
+    """A pile of sticks that move around the arena. If the sticks hit a line that's being drawn, life is lost.
+    The state lives in a slot of an ArenaEnemySwarm (a private one if none is given)."""
+    __slots__ = ('arena', 'swarm', 'index')
+    end1_x = _swarm_field('end1_x')
+    end1_y = _swarm_field('end1_y')
+    end2_x = _swarm_field('end2_x')
+    end2_y = _swarm_field('end2_y')
+    vel1_x = _swarm_field('vel1_x')
+    vel1_y = _swarm_field('vel1_y')
+    vel2_x = _swarm_field('vel2_x')
+    vel2_y = _swarm_field('vel2_y')
+    count1 = _swarm_field('count1')
+    count2 = _swarm_field('count2')
+    intersected = _swarm_field('intersected')
+    directions = ArenaEnemySwarm.DIRECTIONS
+
+    def __init__(self, arena, swarm=None):
+        self.arena = arena
+        self.swarm = swarm if swarm is not None else ArenaEnemySwarm(arena)
         # Place endpoints in the free interior, offset from center
         cx = arena.arena_width // 2
         cy = arena.arena_height // 2
-        self.end1_x = cx - random.randint(1, 5)
-        self.end1_y = cy - random.randint(1, 5)
-        self.end2_x = cx + random.randint(1, 5)
-        self.end2_y = cy + random.randint(1, 5)
-        self.directions = [(1,0),(1,1),(0,1),(-1,0),(-1,-1),(0,-1),(1,-1),(-1,1),(0,0)]
-        self.count1 = 5
-        self.count2 = 5
-        self.vel1_x, self.vel1_y = random.choice(self.directions)
-        self.vel2_x, self.vel2_y = random.choice(self.directions)
+        randint = arena.rng.randint
+        end1_x = cx - randint(1, 5)
+        end1_y = cy - randint(1, 5)
+        end2_x = cx + randint(1, 5)
+        end2_y = cy + randint(1, 5)
+        vel1 = arena.rng.choice(self.directions)
+        vel2 = arena.rng.choice(self.directions)
+        self.index = self.swarm.add(end1_x, end1_y, end2_x, end2_y, vel1, vel2)
 
     def move(self):
-        """Return the next position to move into."""
-        self.count1 -= 1
-        self.intersected = False
-        if self.count1 < 0:
-            self.vel1_x, self.vel1_y = random.choice(self.directions)
-            self.vel2_x, self.vel2_y = random.choice(self.directions)
-            self.count1 = random.randint(5, 100)
-        self.count2 -= 1
-        if self.count2 < 0:
-            self.vel1_x, self.vel1_y = random.choice(self.directions)
-            self.vel2_x, self.vel2_y = random.choice(self.directions)
-            self.count2 = random.randint(5, 100)
-
-        if self.can_move(self.end1_x, self.end1_y, self.vel1_x, 0) and \
-            not self.intersects(self.end1_x + self.vel1_x, self.end1_y, self.end2_x, self.end2_y):
-            self.end1_x += self.vel1_x
-        else:
-            self.vel1_x = 0
-            self.count1 = 0
-        if self.can_move(self.end1_x, self.end1_y, 0, self.vel1_y) and \
-            not self.intersects(self.end1_x, self.end1_y + self.vel1_y, self.end2_x, self.end2_y):
-            self.end1_y += self.vel1_y
-        else:
-            self.vel1_y = 0
-            self.count1 = 0
-        if self.can_move(self.end2_x, self.end2_y, self.vel2_x, 0) and \
-            not self.intersects(self.end1_x, self.end1_y, self.end2_x + self.vel2_x, self.end2_y):
-            self.end2_x += self.vel2_x
-        else:
-            self.vel2_x = 0
-            self.count2 = 0
-        if self.can_move(self.end2_x, self.end2_y, 0, self.vel2_y) and \
-            not self.intersects(self.end1_x, self.end1_y, self.end2_x, self.end2_y + self.vel2_y):
-            self.end2_y += self.vel2_y
-        else:
-            self.vel2_y = 0
-            self.count2 = 0
+        """Move one step. Returns the new endpoints and whether the stick hit the drawing."""
+        self.swarm.step(self.index, self.index + 1)
         return (self.end1_x, self.end1_y), (self.end2_x, self.end2_y), self.intersected
 
     def intersects(self, x1, y1, x2, y2):
-        for (x, y) in bresenham.bresenham(x1, y1, x2, y2):
-            cell = self.arena.get_cell(x, y)
-            if cell != CellState.FREE:
-                if cell == CellState.DRAWING:
-                    logger.debug("Line intersected with drawing")
-                    self.intersected = True
-                return True
-        return False
+        """Return True if the stick from (x1, y1) to (x2, y2) covers a cell that is not FREE."""
+        cell = _stick_hit(self.arena.cells, self.arena.arena_width, x1, y1, x2, y2)
+        if cell == _DRAWING:
+            logger.debug("Line intersected with drawing")
+            self.intersected = True
+        return cell != _FREE
 
     def can_move(self, x, y, dx, dy):
         nx, ny = x + dx, y + dy
-        if nx < 0 or nx >= self.arena.arena_width or ny < 0 or ny >= self.arena.arena_height:
+        arena = self.arena
+        if nx < 0 or nx >= arena.arena_width or ny < 0 or ny >= arena.arena_height:
             return False
-        return self.arena.get_cell(nx, ny) == CellState.FREE
+        return arena.cells[ny * arena.arena_width + nx] == _FREE
+
+
+class LineEnemySwarm(object):
+    """Positions and directions of a group of line enemies in parallel lists, one slot
+    per enemy, advanced together by step(). LineEnemy objects are views onto single slots."""
+    __slots__ = ('arena', 'x', 'y', 'direction')
+
+    def __init__(self, arena):
+        self.arena = arena
+        self.x = []
+        self.y = []
+        self.direction = []
+
+    def __len__(self):
+        return len(self.x)
+
+    def add(self, x, y, direction):
+        """Append an enemy and return its slot index."""
+        self.x.append(x)
+        self.y.append(y)
+        self.direction.append(direction)
+        return len(self.x) - 1
+
+    def step(self, start=0, stop=None):
+        """Move the enemies in slots start..stop-1 one cell along the walls.
+        Each keeps going or turns at random into another walkable direction, but never
+        straight back; an enemy with nowhere to go stays put (direction 4)."""
+        arena = self.arena
+        walk_mask = arena._walk_mask
+        w = arena.arena_width
+        xs, ys, directions = self.x, self.y, self.direction
+        choice = arena.rng.choice
+        if stop is None:
+            stop = len(xs)
+        for i in range(start, stop):
+            x, y = xs[i], ys[i]
+            possible_new_directions = _LINE_ENEMY_CHOICES[directions[i]][walk_mask[y * w + x]]
+            if not possible_new_directions:
+                logger.debug("No possible directions for line enemy to move")
+                directions[i] = 4
+                continue
+            next_direction = choice(possible_new_directions)
+            directions[i] = next_direction
+            dx, dy = _DIRECTION_DELTAS[next_direction]
+            xs[i] = x + dx
+            ys[i] = y + dy
 
 
 class LineEnemy(object):
-    """An enemy dot that traverse the lines. If the dot hits the player, life is lost."""
-    def __init__(self, arena, x, y):
-        self.x = x
-        self.y = y
+    """An enemy dot that traverse the lines. If the dot hits the player, life is lost.
+    The state lives in a slot of a LineEnemySwarm (a private one if none is given)."""
+    __slots__ = ('arena', 'swarm', 'index')
+    x = _swarm_field('x')
+    y = _swarm_field('y')
+    direction = _swarm_field('direction')
+
+    def __init__(self, arena, x, y, swarm=None):
         self.arena = arena
-        self.move_map = {0: (1, 0), 1: (-1, 0), 2: (0, 1), 3: (0, -1), 4: (0, 0)}
-        self.direction = random.choice([2, 3])
-        self.tick = 0
+        self.swarm = swarm if swarm is not None else LineEnemySwarm(arena)
+        self.index = self.swarm.add(x, y, arena.rng.choice([2, 3]))
 
     def move(self):
-        """Return the next position to move into.
-        Strategy is to keep moving in the current direction.
-        If possible to move to different direction than the current direction,
-        make a random choice between the current direction and the new direction."""
-        current_direction = self.direction
-        possible_new_directions = []
-        if self.can_move(1, 0) and current_direction != 1:
-            possible_new_directions.append(0)
-        if self.can_move(-1, 0) and current_direction != 0:
-            possible_new_directions.append(1)
-        if self.can_move(0, 1) and current_direction != 3:
-            possible_new_directions.append(2)
-        if self.can_move(0, -1) and current_direction != 2:
-            possible_new_directions.append(3)
-        if len(possible_new_directions) == 0:
-            logger.debug("No possible directions for line enemy to move")
-            self.direction = 4
-            return 0, 0
-        next_direction = random.choice(possible_new_directions)
-        self.direction = next_direction
-        x, y = self.move_map[next_direction]
-        self.x += x
-        self.y += y
-        return x, y
+        """Move one cell along the walls and return the (dx, dy) taken."""
+        x, y = self.x, self.y
+        self.swarm.step(self.index, self.index + 1)
+        return self.x - x, self.y - y
 
     def can_move(self, dx, dy):
+        arena = self.arena
         nx, ny = self.x + dx, self.y + dy
-        if nx < 0 or nx >= self.arena.arena_width or ny < 0 or ny >= self.arena.arena_height:
+        if nx < 0 or nx >= arena.arena_width or ny < 0 or ny >= arena.arena_height:
             return False
-        cell = self.arena.get_cell(nx, ny)
-        return cell == CellState.WALL or cell == CellState.DRAWING
+        cell = arena.cells[ny * arena.arena_width + nx]
+        return cell == _WALL or cell == _DRAWING
 
 
 class FuseEnemy(object):
     """A fuse that follows the player's drawing path. Kills the player if it catches up."""
     COLOR_BRIGHT = (255, 255, 100)
     COLOR_DARK = (200, 60, 0)
+    __slots__ = ('path', 'x', 'y', 'path_index', 'delay', 'active')
 
     def __init__(self, path, start_x, start_y, delay=10):
         self.path = path
@@ -409,12 +770,12 @@ class FuseEnemy(object):
 
     def move(self, steps=1):
         """Advance steps along the player's path. Returns True if the fuse caught the player."""
-        positions = self.path.get_positions()
-        if len(positions) < self.delay:
+        path = self.path
+        if len(path) < self.delay:
             return False  # waiting for player to get a head start
         for _ in range(steps):
-            if self.path_index < len(positions):
-                self.x, self.y = positions[self.path_index]
+            if self.path_index < len(path):
+                self.x, self.y = path[self.path_index]
                 self.path_index += 1
             else:
                 return True  # caught the player
@@ -427,16 +788,274 @@ class FuseEnemy(object):
         return self.COLOR_DARK
 
 
+class _PathRegion(object):
+    """A free region being discovered from the cells next to the player's path.
+    Regions that turn out to touch are merged with a small union-find (`parent`)."""
+    UNDECIDED, KEPT, DONE = range(3)
+    __slots__ = ('code', 'parent', 'state', 'stack', 'spans', 'count', 'has_enemy')
+
+    def __init__(self, code):
+        self.code = code        # cell code its spans are marked with while discovering
+        self.parent = self
+        self.state = _PathRegion.UNDECIDED
+        self.stack = []         # scanline seeds still to explore
+        self.spans = []         # (y, x_left, x_right) explored so far
+        self.count = 0
+        self.has_enemy = False
+
+    def root(self):
+        region = self
+        while region.parent is not region:
+            region.parent = region.parent.parent
+            region = region.parent
+        return region
+
+
+class _PositionSet(object):
+    """A set of (x, y) positions with O(1) add, discard, membership and random choice.
+    Positions are kept in a list and a dict maps each one to its list index, so a
+    removal moves the last position into the gap."""
+    def __init__(self, positions=()):
+        self._positions = []
+        self._index = {}
+        for position in positions:
+            self.add(position)
+
+    def __len__(self):
+        return len(self._positions)
+
+    def __contains__(self, position):
+        return position in self._index
+
+    def __iter__(self):
+        return iter(self._positions)
+
+    def add(self, position):
+        if position not in self._index:
+            self._index[position] = len(self._positions)
+            self._positions.append(position)
+
+    def discard(self, position):
+        i = self._index.pop(position, None)
+        if i is None:
+            return
+        last = self._positions.pop()
+        if i < len(self._positions):
+            self._positions[i] = last
+            self._index[last] = i
+
+    def choice(self, rng=random):
+        """Return a random position drawn from rng."""
+        return rng.choice(self._positions)
+
+    def copy(self):
+        """Return an independent copy with the same positions in the same order."""
+        other = _PositionSet()
+        other._positions = self._positions.copy()
+        other._index = self._index.copy()
+        return other
+
+
+class _LRUCache(object):
+    """A small thread-safe least-recently-used cache for per-size level artifacts."""
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, build):
+        """Return the entry for key, calling build() to create it on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+        entry = build()
+        with self._lock:
+            self._entries[key] = entry
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class _DrawingRuns(object):
+    """Spatial index of the DRAWING cells, kept as straight runs of the path.
+
+    Each run is an axis-aligned box [x_min, y_min, x_max, y_max]. A cell that continues
+    the most recently added one in a straight line extends its run, anything else starts
+    a new run. Runs are registered in the buckets of a coarse grid they overlap, so a
+    query only looks at runs near the query box. A run that shrinks stays registered
+    in the buckets it used to cover until it is removed; queries check the boxes."""
+    BUCKET_SIZE = 8
+
+    def __init__(self):
+        self.runs = {}         # run id -> box
+        self._buckets = {}     # (bx, by) -> set of run ids
+        self._registered = {}  # run id -> [bx_min, by_min, bx_max, by_max] it is registered in
+        self._last = None      # (run id, x, y) of the most recently added cell
+        self._next_id = 0
+
+    def __len__(self):
+        return len(self.runs)
+
+    def add(self, x, y):
+        if self._last is not None:
+            run_id, last_x, last_y = self._last
+            box = self.runs.get(run_id)
+            if box is not None and abs(x - last_x) + abs(y - last_y) == 1:
+                horizontal = y == last_y and box[1] == box[3]
+                vertical = x == last_x and box[0] == box[2]
+                if horizontal or vertical:
+                    box[0], box[1] = min(box[0], x), min(box[1], y)
+                    box[2], box[3] = max(box[2], x), max(box[3], y)
+                    self._register(run_id, x, y, x, y)
+                    self._last = (run_id, x, y)
+                    return
+        self._last = (self._new_run(x, y, x, y), x, y)
+
+    def discard(self, x, y):
+        size = self.BUCKET_SIZE
+        for run_id in self._buckets.get((x // size, y // size), ()):
+            box = self.runs[run_id]
+            if box[0] <= x <= box[2] and box[1] <= y <= box[3]:
+                break
+        else:
+            return
+        if self._last is not None and self._last[0] == run_id:
+            self._last = None
+        x0, y0, x1, y1 = box
+        if x0 == x1 and y0 == y1:
+            del self.runs[run_id]
+            bx0, by0, bx1, by1 = self._registered.pop(run_id)
+            for by in range(by0, by1 + 1):
+                for bx in range(bx0, bx1 + 1):
+                    self._buckets[(bx, by)].discard(run_id)
+        elif y0 == y1:
+            # Horizontal run: shrink from an end, or split around the cell
+            if x == x0:
+                box[0] = x + 1
+            elif x == x1:
+                box[2] = x - 1
+            else:
+                box[2] = x - 1
+                self._new_run(x + 1, y, x1, y)
+        else:
+            if y == y0:
+                box[1] = y + 1
+            elif y == y1:
+                box[3] = y - 1
+            else:
+                box[3] = y - 1
+                self._new_run(x, y + 1, x, y1)
+
+    def overlapping(self, x0, y0, x1, y1):
+        """Return the boxes of the runs that overlap the box (x0, y0)-(x1, y1)."""
+        if not self.runs:
+            return []
+        size = self.BUCKET_SIZE
+        buckets = self._buckets
+        runs = self.runs
+        run_ids = set()
+        for by in range(y0 // size, y1 // size + 1):
+            for bx in range(x0 // size, x1 // size + 1):
+                bucket = buckets.get((bx, by))
+                if bucket:
+                    run_ids.update(bucket)
+        return [box for box in map(runs.__getitem__, run_ids)
+                if box[0] <= x1 and x0 <= box[2] and box[1] <= y1 and y0 <= box[3]]
+
+    def _new_run(self, x0, y0, x1, y1):
+        run_id = self._next_id
+        self._next_id += 1
+        self.runs[run_id] = [x0, y0, x1, y1]
+        self._register(run_id, x0, y0, x1, y1)
+        return run_id
+
+    def _register(self, run_id, x0, y0, x1, y1):
+        size = self.BUCKET_SIZE
+        bx0, by0, bx1, by1 = x0 // size, y0 // size, x1 // size, y1 // size
+        for by in range(by0, by1 + 1):
+            for bx in range(bx0, bx1 + 1):
+                self._buckets.setdefault((bx, by), set()).add(run_id)
+        registered = self._registered.setdefault(run_id, [bx0, by0, bx1, by1])
+        registered[0], registered[1] = min(registered[0], bx0), min(registered[1], by0)
+        registered[2], registered[3] = max(registered[2], bx1), max(registered[3], by1)
+
+
+def _stick_hits_box(x1, y1, x2, y2, box):
+    """Return True if the Bresenham line from (x1, y1) to (x2, y2) covers a cell of box.
+
+    The continuous segment is first clipped (Liang-Barsky) against the box grown by
+    half a cell; a rasterised cell inside the box lies within half a cell of the true
+    line, so only the few Bresenham steps inside the clipped range need checking.
+    Step k of the line is at major offset k and minor offset
+    floor((2 * k * d_minor + d_major) / (2 * d_major)), the closed form of the
+    integer error-term walk in _stick_hit."""
+    bx0, by0, bx1, by1 = box
+    dx = x2 - x1
+    dy = y2 - y1
+    t0, t1 = 0.0, 1.0
+    for p, q in ((-dx, x1 - bx0 + 0.5), (dx, bx1 + 0.5 - x1),
+                 (-dy, y1 - by0 + 0.5), (dy, by1 + 0.5 - y1)):
+        if p == 0:
+            if q < 0:
+                return False
+        elif p < 0:
+            t0 = max(t0, q / p)
+        else:
+            t1 = min(t1, q / p)
+    if t0 > t1:
+        return False
+    sign_x = 1 if dx > 0 else -1
+    sign_y = 1 if dy > 0 else -1
+    dx = abs(dx)
+    dy = abs(dy)
+    steep = dx <= dy
+    major, minor = (dy, dx) if steep else (dx, dy)
+    if major == 0:
+        return True  # a single cell, already known to be inside the box
+    for k in range(max(0, int(t0 * major) - 1), min(major, int(t1 * major) + 1) + 1):
+        m = (2 * k * minor + major) // (2 * major)
+        if steep:
+            x, y = x1 + sign_x * m, y1 + sign_y * k
+        else:
+            x, y = x1 + sign_x * k, y1 + sign_y * m
+        if bx0 <= x <= bx1 and by0 <= y <= by1:
+            return True
+    return False
+
+
 class Arena(object):
-    """The arena where the game takes place."""
-    def __init__(self, config):
-        self._cells = []
+    """The arena where the game takes place.
+
+    Cells are stored row-major in a bytearray holding raw CellState codes;
+    `cells` is a memoryview over the same buffer for hot paths that index it directly.
+    Writes must go through set_cell (or the fill) so the running count of
+    WALL + FILLED cells behind filled_percent stays correct, the index of WALL
+    positions (`_walls`), the per-cell mask of walkable neighbours used by line
+    enemies (`_walk_mask`) and the run index of DRAWING cells (`_drawing_runs`) stay
+    in sync, and the arena knows whether its free space is still a single region
+    (`_free_regions`).
+    """
+    _templates = _LRUCache(8)  # (arena class, width, height) -> empty arena, from _build_template
+
+    def __init__(self, config, rng=None):
         self.arena_width = config.arena_width
         self.arena_height = config.arena_height
+        self.rng = rng if rng is not None else random  # drives enemy placement and movement
         self._initialize_arena()
         self.player = Player(self, 0, 0)
+        self.line_swarm = LineEnemySwarm(self)
         self.line_enemies = self._spawn_line_enemies(config.num_line_enemies)
-        self.arena_enemies = [ArenaEnemy(self) for _ in range(config.num_arena_enemies)]
+        self.arena_swarm = ArenaEnemySwarm(self)
+        self.arena_enemies = [ArenaEnemy(self, self.arena_swarm) for _ in range(config.num_arena_enemies)]
         logger.debug("Initialized arena: %d x %d (level %d)",
                      self.arena_width, self.arena_height, config.level_number)
 
@@ -447,116 +1066,157 @@ class Arena(object):
         player_x, player_y = self.player.start_pos
         excluded = {(player_x + dx, player_y + dy)
                     for dx in (-1, 0, 1) for dy in (-1, 0, 1)}
+        wall_positions = [p for p in self._walls if p not in excluded]
+        self.rng.shuffle(wall_positions)
+        for i in range(count):
+            x, y = wall_positions[i % len(wall_positions)]
+            enemies.append(LineEnemy(self, x, y, self.line_swarm))
+        return enemies
+
+    def _perimeter_positions(self):
+        """Return all (x, y) positions on the arena perimeter."""
         wall_positions = []
-        # Collect all wall positions on the perimeter
         for x in range(self.arena_width):
             wall_positions.append((x, 0))
             wall_positions.append((x, self.arena_height - 1))
         for y in range(1, self.arena_height - 1):
             wall_positions.append((0, y))
             wall_positions.append((self.arena_width - 1, y))
-        wall_positions = [p for p in wall_positions if p not in excluded]
-        random.shuffle(wall_positions)
-        for i in range(count):
-            x, y = wall_positions[i % len(wall_positions)]
-            enemies.append(LineEnemy(self, x, y))
-        return enemies
+        return wall_positions
 
     @property
     def filled_percent(self):
         """Return the fraction of the arena that is filled (FILLED + WALL cells vs total)."""
-        filled = sum(1 for c in self._cells if c == CellState.FILLED or c == CellState.WALL)
-        return filled / len(self._cells)
+        return self._filled_count / len(self._cells)
 
     def get_cell(self, x, y):
+        """Return the raw cell code at (x, y); compares equal to the matching CellState."""
         return self._cells[y * self.arena_width + x]
 
     def set_cell(self, x, y, value):
-        self._cells[y * self.arena_width + x] = value
+        i = y * self.arena_width + x
+        old = self._cells[i]
+        self._filled_count += _COUNTS_AS_FILLED[value] - _COUNTS_AS_FILLED[old]
+        # Drawing over FREE cells (and reverting them) is tracked by the fill itself;
+        # any other change to the free space may split or join regions.
+        if (old == _FREE) != (value == _FREE) and old != _DRAWING and value != _DRAWING:
+            self._free_regions = None
+        if (old == _WALL) != (value == _WALL):
+            if value == _WALL:
+                self._walls.add((x, y))
+            else:
+                self._walls.discard((x, y))
+        if _WALKABLE[old] != _WALKABLE[value]:
+            self._set_walkable(x, y, _WALKABLE[value])
+        if (old == _DRAWING) != (value == _DRAWING):
+            if value == _DRAWING:
+                self._drawing_runs.add(x, y)
+            else:
+                self._drawing_runs.discard(x, y)
+        self._cells[i] = value
+
+    def _set_walkable(self, x, y, walkable):
+        """Set or clear the bit pointing at (x, y) in the walk mask of each neighbour."""
+        w = self.arena_width
+        h = self.arena_height
+        walk_mask = self._walk_mask
+        for direction, (dx, dy) in enumerate(_DIRECTION_DELTAS):
+            # The neighbour on the far side reaches (x, y) in this direction
+            nx, ny = x - dx, y - dy
+            if 0 <= nx < w and 0 <= ny < h:
+                if walkable:
+                    walk_mask[ny * w + nx] |= 1 << direction
+                else:
+                    walk_mask[ny * w + nx] &= ~(1 << direction)
 
     def _initialize_arena(self):
-        """Create the arena game state, with a perimeter rectangle of WALL cells filled with FREE cells."""
-        frame = [CellState.WALL] * self.arena_width
-        self._cells += frame
-        row = [CellState.WALL] + [CellState.FREE] * (self.arena_width - 2) + [CellState.WALL]
-        for _ in range(self.arena_height - 2):
-            self._cells += row
-        self._cells += frame
+        """Create the arena game state, with a perimeter rectangle of WALL cells filled with FREE cells.
+        The empty arena of each size is built once and copied (see _build_template)."""
+        cells, walls, walk_mask = self._templates.get(
+            (type(self), self.arena_width, self.arena_height), self._build_template)
+        self._cells = bytearray(cells)
+        self.cells = memoryview(self._cells)
+        self._filled_count = self._cells.count(_WALL)
+        self._free_regions = 1 if self._cells.count(_FREE) else 0  # None when unknown
+        self._walls = walls.copy()
+        self._walk_mask = bytearray(walk_mask)
+        self._drawing_runs = _DrawingRuns()
+
+    def _build_template(self):
+        """Return the cells, wall index and walk mask of an empty arena of this size."""
+        frame = bytes((_WALL,)) * self.arena_width
+        row = bytes((_WALL,)) + bytes((_FREE,)) * (self.arena_width - 2) + bytes((_WALL,))
+        self._cells = bytearray(frame + row * (self.arena_height - 2) + frame)
+        self._walls = _PositionSet(self._perimeter_positions())
+        self._walk_mask = bytearray(len(self._cells))
+        for x, y in self._walls:
+            self._set_walkable(x, y, True)
+        return bytes(self._cells), self._walls, bytes(self._walk_mask)
+
+    def _restore_cells(self, cells, walls, free_regions):
+        """Overwrite the cells in place with a saved buffer and rebuild the indices over
+        them. walls lists the WALL positions in the saved index order, which random
+        respawns pick from; the DRAWING cells are taken from the player's path."""
+        self._cells[:] = cells
+        self._filled_count = self._cells.count(_WALL) + self._cells.count(_FILLED)
+        self._free_regions = free_regions
+        self._walls = _PositionSet(walls)
+        self._walk_mask = bytearray(len(self._cells))
+        self._drawing_runs = _DrawingRuns()
+        for x, y in self._walls:
+            self._set_walkable(x, y, True)
+        w = self.arena_width
+        for x, y in self.player.path:
+            if self._cells[y * w + x] == _DRAWING:
+                self._set_walkable(x, y, True)
+                self._drawing_runs.add(x, y)
 
     def get_free_position(self):
         """Return the first empty (i.e., not filled or being drawn) position in the arena."""
-        for y in range(self.arena_height):
-            for x in range(self.arena_width):
-                if self.get_cell(x, y) == CellState.FREE:
-                    return x, y
-        return None # No free position found
+        i = self._cells.find(_FREE)
+        if i == -1:
+            return None # No free position found
+        return i % self.arena_width, i // self.arena_width
+
+    def stick_touches_path(self, x1, y1, x2, y2):
+        """Return True if the stick from (x1, y1) to (x2, y2) covers a DRAWING cell.
+        Only the path runs whose boxes overlap the stick's box are tested."""
+        for box in self._drawing_runs.overlapping(min(x1, x2), min(y1, y2),
+                                                  max(x1, x2), max(y1, y2)):
+            if _stick_hits_box(x1, y1, x2, y2, box):
+                return True
+        return False
 
     def change_player_path_state_to(self, state_value):
-        for x, y in self.player.path.get_positions():
+        for x, y in self.player.path:
             if self.get_cell(x, y) == CellState.DRAWING:
                 self.set_cell(x, y, state_value)
         if state_value == CellState.FREE:
             self._respawn_stranded_line_enemies()
 
     def _respawn_stranded_line_enemies(self):
-        """Relocate any line enemy that is no longer on a WALL or DRAWING cell."""
-        wall_positions = []
-        for x in range(self.arena_width):
-            wall_positions.append((x, 0))
-            wall_positions.append((x, self.arena_height - 1))
-        for y in range(1, self.arena_height - 1):
-            wall_positions.append((0, y))
-            wall_positions.append((self.arena_width - 1, y))
+        """Relocate any line enemy that is no longer on a WALL or DRAWING cell
+        to a random WALL cell, including walls left behind by completed paths."""
         for enemy in self.line_enemies:
             cell = self.get_cell(enemy.x, enemy.y)
             if cell != CellState.WALL and cell != CellState.DRAWING:
-                pos = random.choice(wall_positions)
+                pos = self._walls.choice(self.rng)
                 enemy.x, enemy.y = pos
                 logger.debug("Respawned stranded line enemy to (%d,%d)", pos[0], pos[1])
 
     def fill_arena(self, fill_callback):
-        # Precompute enemy positions
-        enemy_positions = set()
-        for enemy in self.arena_enemies:
-            enemy_positions.add((enemy.end1_x, enemy.end1_y))
-            enemy_positions.add((enemy.end2_x, enemy.end2_y))
-
-        # Assign each disjoint free region a unique id
-        # and track size + whether it contains an enemy
-        region_id = CellState._TEMP_REGION
-        region_info = {}  # region_id -> (cell_count, contains_enemy)
-
-        for y in range(self.arena_height):
-            for x in range(self.arena_width):
-                if self.get_cell(x, y) == CellState.FREE:
-                    count, has_enemy = self._scanline_fill(x, y, region_id, enemy_positions)
-                    region_info[region_id] = (count, has_enemy)
-                    region_id += 1
-
-        if region_info:
-            # Keep all regions that contain an enemy.
-            # If no region has an enemy, keep the largest region.
-            keep_ids = {rid for rid, (count, has_enemy) in region_info.items() if has_enemy}
-            if not keep_ids:
-                keep_ids = {max(region_info, key=lambda rid: region_info[rid][0])}
-
-            # Check if every region has an enemy (nothing to fill = wasted draw)
-            # This only applies when there are multiple regions — if there's just one,
-            # the draw simply didn't create a closure, which is a normal outcome.
-            wasted_draw = (len(region_info) > 1 and keep_ids == set(region_info.keys()))
-
-            # Single linear pass: fill non-kept regions, reset kept regions to FREE
-            for i in range(len(self._cells)):
-                v = self._cells[i]
-                if v >= CellState._TEMP_REGION:
-                    if v in keep_ids:
-                        self._cells[i] = CellState.FREE
-                    else:
-                        self._cells[i] = CellState.FILLED
-                        fill_callback(i % self.arena_width, i // self.arena_width)
-        else:
-            wasted_draw = False
-            logger.debug("Arena filled")
+        """Per-cell adapter for fill_arena_spans: calls fill_callback(x, y) for each
+        filled cell. Returns True if something was filled."""
+        def fill_span(y, x_start, x_end):
+            for x in range(x_start, x_end + 1):
+                fill_callback(x, y)
+        return self.fill_arena_spans(fill_span)
+
+    def fill_arena_spans(self, span_callback):
+        """Fill every enclosed region that is not kept after the player completed a path.
+        Calls span_callback(y, x_start, x_end) once per horizontal run of filled cells
+        (x_end inclusive). Returns True if something was filled."""
+        wasted_draw = self._fill_regions(span_callback)
 
         # Update arena state: if every region had an enemy (wasted draw), revert path to FREE
         if wasted_draw:
@@ -567,199 +1227,1391 @@ class Arena(object):
         self.player.drawing_completed = True
         return not wasted_draw  # True if something was filled
 
-    def _scanline_fill(self, seedx, seedy, region_id, enemy_positions):
-        """Scanline span-fill: marks all connected FREE cells with region_id.
-        Returns (cell_count, contains_enemy)."""
+    def _fill_regions(self, span_callback):
+        """Fill the regions that are not kept. Returns True if the draw was wasted,
+        i.e. there were several regions and every one of them had to be kept."""
+        wasted_draw = self._fill_path_regions(span_callback)
+        if wasted_draw is None:
+            wasted_draw = self._fill_enemy_regions(span_callback)
+        return wasted_draw
+
+    def _fill_path_regions(self, span_callback):
+        """Discover only the regions next to the just-completed path.
+
+        When the free space was a single region before the draw, every region left
+        afterwards touches the path, so discovery is seeded from the free neighbours
+        of the path. All regions grow together, smallest first; a region stops as soon
+        as it is known to hold an enemy, and once a single undecided region remains it
+        is decided without exploring it: it owns every FREE cell nobody else reached.
+        Closing a small pocket therefore costs about the size of the pocket.
+        Region codes live in the cell bytes while discovering, hence the cap below.
+
+        Returns the wasted-draw flag, or None if the arena is not known to be a single
+        free region or the path touches too many separate pockets to track."""
+        if self._free_regions != 1:
+            return None
+        cells = self._cells
+        w = self.arena_width
+        h = self.arena_height
+
+        # Free cells next to the path; 4-adjacent ones start out in the same region
+        seeds = {}
+        for x, y in self.player.path:
+            for nx, ny in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+                if 0 <= nx < w and 0 <= ny < h and cells[ny * w + nx] == _FREE:
+                    seeds[(nx, ny)] = None
+        regions = []
+        region_of = {}
+        for seed in seeds:
+            if seed in region_of:
+                continue
+            if _TEMP_REGION + len(regions) > 255:
+                return None
+            region = _PathRegion(_TEMP_REGION + len(regions))
+            regions.append(region)
+            region_of[seed] = region
+            todo = [seed]
+            while todo:
+                x, y = todo.pop()
+                region.stack.append((x, y))
+                for neighbour in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+                    if neighbour in seeds and neighbour not in region_of:
+                        region_of[neighbour] = region
+                        todo.append(neighbour)
+
+        enemy_cells = []
+        enemy_rows = {}  # y -> [x] of enemy endpoints on FREE cells
+        for enemy in self.arena_enemies:
+            for x, y in ((enemy.end1_x, enemy.end1_y), (enemy.end2_x, enemy.end2_y)):
+                if cells[y * w + x] == _FREE:
+                    enemy_cells.append(y * w + x)
+                    enemy_rows.setdefault(y, []).append(x)
+        free_total = cells.count(_FREE)
+
+        # Regions grow smallest first until at most one is undecided, and every kept
+        # region but one is fully explored (two partly explored kept regions might
+        # still turn out to be the same one)
+        undecided = len(regions)
+        open_kept = set()
+
+        def merge(region, code):
+            """Merge the region owning cells marked `code` into `region`."""
+            nonlocal undecided
+            other = regions[code - _TEMP_REGION].root()
+            if other is region:
+                return
+            other.parent = region
+            region.stack.extend(other.stack)
+            region.spans.extend(other.spans)
+            region.count += other.count
+            open_kept.discard(other)
+            if other.state == _PathRegion.UNDECIDED:
+                undecided -= 1
+            elif other.state == _PathRegion.KEPT:
+                region.has_enemy = True
+
+        heap = [(0, region.code, region) for region in regions]
+        while undecided > 1 or (undecided == 1 and open_kept) or (undecided == 0 and len(open_kept) > 1):
+            count, code, region = heapq.heappop(heap)
+            if region.parent is not region or not region.stack or region.state == _PathRegion.DONE:
+                continue  # stale entry for a merged or finished region
+            # One scanline step, as in _scanline_fill but marking with the region's
+            # code and merging with any other region it runs into
+            x, y = region.stack.pop()
+            row_offset = y * w
+            cell = cells[row_offset + x]
+            if cell != _FREE:
+                if cell >= _TEMP_REGION:
+                    merge(region, cell)
+            else:
+                x_left = x
+                while x_left > 0 and cells[row_offset + x_left - 1] == _FREE:
+                    x_left -= 1
+                x_right = x
+                while x_right < w - 1 and cells[row_offset + x_right + 1] == _FREE:
+                    x_right += 1
+                for xi in (x_left - 1, x_right + 1):
+                    if 0 <= xi < w and cells[row_offset + xi] >= _TEMP_REGION:
+                        merge(region, cells[row_offset + xi])
+                length = x_right - x_left + 1
+                cells[row_offset + x_left:row_offset + x_right + 1] = bytes((region.code,)) * length
+                region.spans.append((y, x_left, x_right))
+                region.count += length
+                for ex in enemy_rows.get(y, ()):
+                    if x_left <= ex <= x_right:
+                        region.has_enemy = True
+                for ny in (y - 1, y + 1):
+                    if ny < 0 or ny >= h:
+                        continue
+                    nrow_offset = ny * w
+                    xi = x_left
+                    while xi <= x_right:
+                        cell = cells[nrow_offset + xi]
+                        if cell == _FREE:
+                            region.stack.append((xi, ny))
+                            while xi <= x_right and cells[nrow_offset + xi] == _FREE:
+                                xi += 1
+                        else:
+                            if cell >= _TEMP_REGION:
+                                merge(region, cell)
+                            xi += 1
+            if region.state == _PathRegion.UNDECIDED:
+                if region.has_enemy:
+                    region.state = _PathRegion.KEPT
+                    undecided -= 1
+                elif not region.stack:
+                    region.state = _PathRegion.DONE
+                    undecided -= 1
+            if region.state == _PathRegion.KEPT:
+                if region.stack:
+                    open_kept.add(region)
+                else:
+                    open_kept.discard(region)
+            if region.stack:
+                heapq.heappush(heap, (region.count, region.code, region))
+
+        roots = [region for region in regions if region.parent is region]
+        sizes = {region: region.count for region in roots}
+        last = None
+        if undecided == 1:
+            # Every FREE cell not reached by the other (fully explored) regions
+            # belongs to the last one
+            last = next(region for region in roots if region.state == _PathRegion.UNDECIDED)
+            sizes[last] = free_total - sum(region.count for region in roots if region is not last)
+            for i in enemy_cells:
+                if cells[i] == _FREE or regions[cells[i] - _TEMP_REGION].root() is last:
+                    last.has_enemy = True
+                    break
+
+        # Keep all regions that contain an enemy.
+        # If no region has an enemy, keep the largest region.
+        kept = {region for region in roots if region.has_enemy}
+        if not roots:
+            logger.debug("Arena filled")
+        elif not kept:
+            kept = {max(roots, key=lambda region: sizes[region])}
+        wasted_draw = (len(roots) > 1 and len(kept) == len(roots))
+
+        filled = 0
+        if last is not None and last not in kept:
+            filled += self._fill_free_runs(span_callback)
+        free_row = memoryview(bytes((_FREE,)) * w)
+        filled_row = memoryview(bytes((_FILLED,)) * w)
+        for region in roots:
+            keep = region in kept
+            for y, x_left, x_right in region.spans:
+                start = y * w + x_left
+                length = x_right - x_left + 1
+                if keep:
+                    cells[start:start + length] = free_row[:length]
+                else:
+                    cells[start:start + length] = filled_row[:length]
+                    span_callback(y, x_left, x_right)
+            if not keep:
+                filled += region.count
+        self._filled_count += filled
+        if not wasted_draw:
+            self._free_regions = len(kept)
+        return wasted_draw
+
+    def _fill_enemy_regions(self, span_callback):
+        """Whole-board fill: regions holding an arena enemy are flood-filled from the
+        enemy endpoints and every FREE cell left over afterwards is filled, so the
+        Python work scales with the kept area rather than the whole board."""
+        cells = self._cells
+        w = self.arena_width
+        seeds = []
+        for enemy in self.arena_enemies:
+            for x, y in ((enemy.end1_x, enemy.end1_y), (enemy.end2_x, enemy.end2_y)):
+                if cells[y * w + x] == _FREE:
+                    seeds.append((x, y))
+        if not seeds:
+            return self._fill_all_but_largest_region(span_callback)
+
+        # Mark the enemy regions, counting how many distinct ones there are
+        kept_regions = 0
+        for x, y in seeds:
+            if cells[y * w + x] == _FREE:
+                self._scanline_fill(x, y, [])
+                kept_regions += 1
+
+        # Whatever is still FREE is not reachable by any enemy: fill it
+        filled = self._fill_free_runs(span_callback)
+        cells[:] = cells.translate(_RELEASE_TEMP_REGION)
+        self._filled_count += filled
+
+        # Every region had an enemy (nothing to fill = wasted draw). This only applies
+        # when there are multiple regions — if there's just one, the draw simply
+        # didn't create a closure, which is a normal outcome.
+        wasted_draw = (filled == 0 and kept_regions > 1)
+        if not wasted_draw:
+            self._free_regions = kept_regions
+        return wasted_draw
+
+    def _fill_free_runs(self, span_callback):
+        """Set every FREE cell to FILLED, calling span_callback for each row of a run.
+        Returns the number of cells filled; the caller updates _filled_count."""
+        cells = self._cells
+        w = self.arena_width
+        runs = [run.span() for run in _FREE_RUN.finditer(cells)]
+        filled = 0
+        for run_start, run_end in runs:
+            filled += run_end - run_start
+            cells[run_start:run_end] = bytes((_FILLED,)) * (run_end - run_start)
+            # A run only wraps around a row end if the frame has been opened up
+            while run_start < run_end:
+                y, x_start = divmod(run_start, w)
+                row_end = min(run_end, (y + 1) * w)
+                span_callback(y, x_start, row_end - 1 - y * w)
+                run_start = row_end
+        return filled
+
+    def _fill_all_but_largest_region(self, span_callback):
+        """Label every free region and fill all of them except the largest one.
+        Used when no arena enemy is in a free region. Never a wasted draw."""
+        # Region ids are kept out of the byte buffer (regions are marked as
+        # _TEMP_REGION and remembered by their spans), so the number of regions
+        # is not limited to 255.
+        cells = self._cells
+        w = self.arena_width
+        regions = []  # (cell_count, spans)
+        pos = cells.find(_FREE)
+        while pos != -1:
+            spans = []
+            count = self._scanline_fill(pos % w, pos // w, spans)
+            regions.append((count, spans))
+            pos = cells.find(_FREE, pos + 1)
+        if not regions:
+            logger.debug("Arena filled")
+            self._free_regions = 0
+            return False
+
+        # Fill the other regions, reset the largest one to FREE, one span at a time
+        keep_id = max(range(len(regions)), key=lambda rid: regions[rid][0])
+        free_row = memoryview(bytes((_FREE,)) * w)
+        filled_row = memoryview(bytes((_FILLED,)) * w)
+        for rid, (count, spans) in enumerate(regions):
+            for y, x_left, x_right in spans:
+                start = y * w + x_left
+                length = x_right - x_left + 1
+                if rid == keep_id:
+                    cells[start:start + length] = free_row[:length]
+                else:
+                    cells[start:start + length] = filled_row[:length]
+                    span_callback(y, x_left, x_right)
+            if rid != keep_id:
+                self._filled_count += count
+        self._free_regions = 1
+        return False
+
+    def _scanline_fill(self, seedx, seedy, spans):
+        """Scanline span-fill: marks all connected FREE cells as _TEMP_REGION and
+        appends the (y, x_left, x_right) spans covered to `spans`.
+        Returns the number of cells marked."""
         cells = self._cells
         w = self.arena_width
         h = self.arena_height
+        temp_row = memoryview(bytes((_TEMP_REGION,)) * w)
         count = 0
-        has_enemy = False
         stack = [(seedx, seedy)]
         while stack:
             x, y = stack.pop()
             row_offset = y * w
-            if cells[row_offset + x] != CellState.FREE:
+            if cells[row_offset + x] != _FREE:
                 continue
             x_left = x
-            while x_left > 0 and cells[row_offset + x_left - 1] == CellState.FREE:
+            while x_left > 0 and cells[row_offset + x_left - 1] == _FREE:
                 x_left -= 1
             x_right = x
-            while x_right < w - 1 and cells[row_offset + x_right + 1] == CellState.FREE:
+            while x_right < w - 1 and cells[row_offset + x_right + 1] == _FREE:
                 x_right += 1
-            for xi in range(x_left, x_right + 1):
-                cells[row_offset + xi] = region_id
-                count += 1
-                if (xi, y) in enemy_positions:
-                    has_enemy = True
+            length = x_right - x_left + 1
+            cells[row_offset + x_left:row_offset + x_right + 1] = temp_row[:length]
+            spans.append((y, x_left, x_right))
+            count += length
             for ny in (y - 1, y + 1):
                 if ny < 0 or ny >= h:
                     continue
                 nrow_offset = ny * w
                 xi = x_left
                 while xi <= x_right:
-                    if cells[nrow_offset + xi] == CellState.FREE:
+                    if cells[nrow_offset + xi] == _FREE:
                         stack.append((xi, ny))
-                        while xi <= x_right and cells[nrow_offset + xi] == CellState.FREE:
+                        while xi <= x_right and cells[nrow_offset + xi] == _FREE:
                             xi += 1
                     else:
                         xi += 1
-        return count, has_enemy
+        return count
 
 
-class Game(object):
-    """Game logic to capture player input and render objects (player, enemies, etc.) from the Arena to the screen."""
-    def __init__(self, canvas, game_config):
-        self.canvas = canvas
-        self.game_config = game_config
-        self.level_generator = LevelGenerator()
-        self.high_score = self._load_high_score()
-        self.state = GameState.TITLE
-        self.running = True
-        # Set initial window size for title screen
-        self.canvas.screen = pygame.display.set_mode(
-            (game_config.max_window_width, game_config.max_window_height))
+class NumpyArena(Arena):
+    """Arena that also views its cells as a 2-D numpy.uint8 array (`grid`, shape
+    height x width) sharing the same buffer. Only region filling is done with array
+    operations, labelling the free regions by horizontal runs plus union-find; every
+    other query is shared with Arena."""
 
-    def _load_high_score(self):
-        path = self.game_config.high_score_file
-        if os.path.exists(path):
-            try:
-                with open(path, 'r') as f:
-                    data = json.load(f)
-                    return data.get('high_score', 0)
-            except (json.JSONDecodeError, OSError):
-                pass
-        return 0
+    def _initialize_arena(self):
+        super()._initialize_arena()
+        self.grid = np.frombuffer(self._cells, dtype=np.uint8).reshape(
+            self.arena_height, self.arena_width)
+
+    def _fill_regions(self, span_callback):
+        grid = self.grid
+        free = grid == _FREE
+        labels, region_count = self._label_free_regions(free)
+        if not region_count:
+            logger.debug("Arena filled")
+            self._free_regions = 0
+            return False
 
-    def _save_high_score(self):
-        path = self.game_config.high_score_file
-        try:
-            with open(path, 'w') as f:
-                json.dump({'high_score': self.high_score}, f)
-        except OSError:
-            logger.warning("Could not save high score to %s", path)
+        # Keep all regions that contain an enemy, or the largest one if none do
+        sizes = np.bincount(labels.ravel(), minlength=region_count + 1)
+        keep_ids = set()
+        for enemy in self.arena_enemies:
+            for x, y in ((enemy.end1_x, enemy.end1_y), (enemy.end2_x, enemy.end2_y)):
+                if labels[y, x]:
+                    keep_ids.add(int(labels[y, x]))
+        if not keep_ids:
+            keep_ids = {int(np.argmax(sizes[1:])) + 1}
+        wasted_draw = (region_count > 1 and len(keep_ids) == region_count)
+        if not wasted_draw:
+            self._free_regions = len(keep_ids)
+
+        fill_mask = free & ~np.isin(labels, list(keep_ids))
+        grid[fill_mask] = _FILLED
+        self._filled_count += int(np.count_nonzero(fill_mask))
+
+        # Horizontal runs of the mask: +1 where a run starts, -1 just past its end
+        edges = np.diff(fill_mask.view(np.int8), axis=1, prepend=0, append=0)
+        start_ys, start_xs = np.nonzero(edges == 1)
+        end_xs = np.nonzero(edges == -1)[1]
+        for y, x_start, x_end in zip(start_ys.tolist(), start_xs.tolist(), end_xs.tolist()):
+            span_callback(y, x_start, x_end - 1)
+        return wasted_draw
+
+    @staticmethod
+    def _label_free_regions(free):
+        """Label 4-connected regions of a boolean mask.
+        Returns (labels, region_count); labels are numbered in row-major order of
+        each region's first cell, 0 marks cells outside any region.
+
+        Each horizontal run of free cells gets an id, runs that touch vertically are
+        merged with a union-find, so Python only loops over runs, never over cells."""
+        h, w = free.shape
+        starts = free.copy()
+        starts[:, 1:] &= ~free[:, :-1]
+        run_ids = np.cumsum(starts.ravel()).reshape(h, w)
+        run_count = int(run_ids[-1, -1])
+        if run_count == 0:
+            return np.zeros((h, w), dtype=np.int64), 0
+
+        touching = free[:-1] & free[1:]
+        edges = np.unique(run_ids[:-1][touching] * (run_count + 1) + run_ids[1:][touching])
+        parent = list(range(run_count + 1))
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        for edge in edges.tolist():
+            a, b = find(edge // (run_count + 1)), find(edge % (run_count + 1))
+            if a < b:
+                parent[b] = a
+            elif b < a:
+                parent[a] = b
+
+        roots = np.array([find(i) for i in range(1, run_count + 1)])
+        unique_roots, region_of_run = np.unique(roots, return_inverse=True)
+        run_labels = np.concatenate(([0], region_of_run + 1))
+        labels = np.where(free, run_labels[run_ids], 0)
+        return labels, len(unique_roots)
+
+
+ARENA_BACKENDS = {'python': Arena, 'numpy': NumpyArena}
+
+
+def create_arena(config, backend='auto', rng=None):
+    """Create an Arena with the requested backend ('python', 'numpy' or 'auto') and
+    enemy random stream (default: the random module).
+    Falls back to the pure-Python Arena when NumPy is not installed."""
+    if backend not in ARENA_BACKENDS and backend != 'auto':
+        raise ValueError(f"Unknown arena backend: {backend!r}")
+    if backend == 'auto':
+        backend = 'numpy' if np is not None else 'python'
+    elif backend == 'numpy' and np is None:
+        logger.warning("NumPy is not installed, using the pure-Python arena")
+        backend = 'python'
+    return ARENA_BACKENDS[backend](config, rng)
+
+
+class _SnapshotWriter(object):
+    """Accumulates struct-packed fields and length-prefixed arrays for Simulation.snapshot."""
+    __slots__ = ('parts',)
 
-    def _start_new_game(self):
-        """Reset all game state and start level 1."""
+    def __init__(self):
+        self.parts = []
+
+    def pack(self, fmt, *values):
+        self.parts.append(struct.pack('<' + fmt, *values))
+
+    def array(self, typecode, values):
+        data = array(typecode, values).tobytes()
+        self.parts.append(struct.pack('<I', len(data)) + data)
+
+    def random_state(self, rng):
+        version, internal, gauss_next = rng.getstate()
+        self.pack('B?d', version, gauss_next is not None, gauss_next or 0.0)
+        self.array('I', internal)
+
+    def getvalue(self):
+        return b''.join(self.parts)
+
+
+class _SnapshotReader(object):
+    """Reads back, in the same order, what a _SnapshotWriter wrote."""
+    __slots__ = ('data', 'offset')
+
+    def __init__(self, data):
+        self.data = data
+        self.offset = 0
+
+    def unpack(self, fmt):
+        fmt = struct.Struct('<' + fmt)
+        values = fmt.unpack_from(self.data, self.offset)
+        self.offset += fmt.size
+        return values
+
+    def array(self, typecode):
+        size, = self.unpack('I')
+        values = array(typecode)
+        values.frombytes(self.data[self.offset:self.offset + size])
+        self.offset += size
+        return values
+
+    def random_state(self, rng):
+        version, has_gauss, gauss_next = self.unpack('B?d')
+        rng.setstate((version, tuple(self.array('I')), gauss_next if has_gauss else None))
+
+
+_LEVEL_CONFIG_FORMAT = 'idHHiiiiiidi'  # LevelConfig fields, in order
+
+
+def _rle_encode(cells):
+    """Run-length encode a cell buffer as (codes, lengths) of its runs of equal codes."""
+    codes = bytearray()
+    lengths = array('I')
+    for run in _CELL_RUN.finditer(cells):
+        start, end = run.span()
+        codes.append(cells[start])
+        lengths.append(end - start)
+    return codes, lengths
+
+
+def _rle_decode(codes, lengths):
+    return b''.join(bytes((code,)) * length for code, length in zip(codes, lengths))
+
+
+class Simulation(object):
+    """Headless game logic: levels, arena, enemies, fuse, lives and score.
+
+    step(actions) advances one frame with the given player input and returns the
+    Events it produced. Nothing here draws or reads the keyboard, so it runs
+    without pygame; Game is the pygame front end over it."""
+    DEATH_FRAMES = 45  # frames the death sequence lasts before respawn or game over
+    SNAPSHOT_MAGIC = b'PSSN'
+    SNAPSHOT_VERSION = 2
+    _STREAMS = ('level', 'enemies', 'fuse', 'effects')  # RandomStreams saved in snapshots
+
+    def __init__(self, game_config, level_generator=None):
+        self.game_config = game_config
+        self.streams = RandomStreams(game_config.seed)
+        if level_generator is None:
+            level_generator = LevelGenerator(swarm_size=game_config.swarm_size, rng=self.streams.level)
+        self.level_generator = level_generator
+        self.state = GameState.TITLE
+        self._events = []
+        self._prepared_arena = None
+
+    def start_new_game(self, seed=None, config=None):
+        """Reset lives and score and start level 1, or the given LevelConfig. The random
+        streams are re-seeded from seed, else GameConfig.seed, else a fresh seed, so a
+        game is reproducible from streams.seed and its inputs alone."""
+        if seed is None:
+            seed = self.game_config.seed
+        self.streams = RandomStreams(seed)
+        self.level_generator.rng = self.streams.level
         self.level_generator.reset()
         self.current_level = 1
-        self.last_n_lines = []
         self.lives = self.game_config.starting_lives
         self.score = 0
-        self.state = GameState.PLAYING
-        config = self.level_generator.build_level(self.current_level)
+        if config is None:
+            config = self.level_generator.build_level(self.current_level)
         self.start_level(config)
 
-    def start_level(self, config):
-        """Initialize a new level from the given config."""
+    def start_level(self, config, arena=None):
+        """Initialize a new level from the given config, using arena if one was built
+        for it by prepare_next_level()."""
         self.config = config
-        self.canvas.configure(config.arena_width, config.arena_height)
-        self.arena = Arena(config)
-        self.canvas.create_arena_frame()
-        self.last_n_lines = []
+        if arena is None:
+            arena = create_arena(config, self.game_config.arena_backend, self.streams.enemies)
+        else:
+            # Carry on from where building the arena left the copied enemy stream
+            self.streams.enemies.setstate(arena.rng.getstate())
+            arena.rng = self.streams.enemies
+        self.arena = arena
+        self._prepared_arena = None
+        self.state = GameState.PLAYING
         self.frame_count = 0
-        self.reset_player_state()
-        self.invincibility_frames = int(self.game_config.invincibility_seconds * self.game_config.fps)
+        self.drawing_direction = None
+        self.fuse = None
+        self.death_frames = 0
+        self.next_level_config = None
+        self.invincibility_frames = self._invincibility_duration()
         logger.debug("Starting level %d (fill target: %.0f%%)",
                      config.level_number, config.fill_percent * 100)
 
-    def reset_player_state(self):
-        self.drawing_direction = None
+    def prepare_next_level(self):
+        """Build the next level's arena ahead of advance_to_next_level(), e.g. on a worker
+        thread while the level transition shows. It draws from a copy of the enemy
+        stream, so the game state (and a snapshot of it) is unchanged until the level
+        starts, and the game plays exactly as if the arena were built then."""
+        config = self.next_level_config
+        rng = random.Random()
+        rng.setstate(self.streams.enemies.getstate())
+        arena = create_arena(config, self.game_config.arena_backend, rng)
+        self._prepared_arena = (config, arena)
+        return arena
+
+    def advance_to_next_level(self):
+        """Start the level generated when the current one was completed."""
+        self.current_level += 1
+        prepared = self._prepared_arena
+        arena = prepared[1] if prepared and prepared[0] is self.next_level_config else None
+        self.start_level(self.next_level_config, arena)
+
+    def step(self, actions=Action.NONE):
+        """Advance the game by one frame. Returns the list of Events produced;
+        outside GameState.PLAYING nothing happens."""
+        events = self._events = []
+        if self.state != GameState.PLAYING:
+            return events
+        if self.death_frames > 0:
+            self.death_frames -= 1
+            if self.death_frames == 0:
+                self._finish_death()
+        else:
+            config = self.config
+            # Player movement: auto-continue drawing direction + input
+            if self.frame_count % config.player_speed == 0:
+                if self.drawing_direction is not None:
+                    self._move(*self.drawing_direction)
+                self._handle_actions(actions)
+            if self.state == GameState.PLAYING:
+                if self.frame_count % config.line_enemy_speed == 0:
+                    self._move_line_enemies()
+                if self.frame_count % config.arena_enemy_speed == 0:
+                    self._move_arena_enemies()
+                self._move_fuse()
+                if self.invincibility_frames > 0:
+                    self.invincibility_frames -= 1
+        self.frame_count += 1
+        return events
+
+    def snapshot(self):
+        """Return the complete game state, including the random streams, as compact
+        bytes (zlib-compressed fields, the cells run-length encoded; arrays in native
+        byte order). Restoring it into a Simulation with the same GameConfig resumes
+        the game exactly."""
+        out = _SnapshotWriter()
+        direction = _DIRECTION_DELTAS.index(self.drawing_direction) if self.drawing_direction else 4
+        out.pack('BIiqQBHI', self.state, self.current_level, self.lives, self.score,
+                 self.frame_count, direction, self.death_frames, self.invincibility_frames)
+        out.pack(_LEVEL_CONFIG_FORMAT, *astuple(self.config))
+        out.pack('?', self.next_level_config is not None)
+        if self.next_level_config is not None:
+            out.pack(_LEVEL_CONFIG_FORMAT, *astuple(self.next_level_config))
+        out.array('B', [ARCHETYPES.index(a) for a in self.level_generator.last_archetypes])
+        out.pack('Q', self.streams.seed)
+        for name in self._STREAMS:
+            out.random_state(getattr(self.streams, name))
+
+        arena = self.arena
+        codes, lengths = _rle_encode(arena._cells)
+        out.array('B', codes)
+        out.array('I', lengths)
+        walls = arena._walls._positions
+        out.array('H', [x for x, _ in walls])
+        out.array('H', [y for _, y in walls])
+        out.pack('i', -1 if arena._free_regions is None else arena._free_regions)
+        player = arena.player
+        out.pack('HH??', player.x, player.y, player.is_drawing, player.drawing_completed)
+        out.array('H', player.path.xs)
+        out.array('H', player.path.ys)
+        for values in (arena.line_swarm.x, arena.line_swarm.y, arena.line_swarm.direction):
+            out.array('i', values)
+        for field in ArenaEnemySwarm.__slots__[1:]:
+            out.array('i', getattr(arena.arena_swarm, field))
+        fuse = self.fuse
+        out.pack('?', fuse is not None)
+        if fuse is not None:
+            out.pack('HHII?', fuse.x, fuse.y, fuse.path_index, fuse.delay, fuse.active)
+
+        header = struct.pack('<4sB', self.SNAPSHOT_MAGIC, self.SNAPSHOT_VERSION)
+        return header + zlib.compress(out.getvalue(), 1)
+
+    def restore(self, data):
+        """Replace the game state with one returned by snapshot(). Raises ValueError if
+        data is not a snapshot."""
+        magic, version = struct.unpack_from('<4sB', data)
+        if magic != self.SNAPSHOT_MAGIC or version != self.SNAPSHOT_VERSION:
+            raise ValueError("Not a pystix snapshot (or an unsupported version)")
+        reader = _SnapshotReader(zlib.decompress(data[5:]))
+        (state, self.current_level, self.lives, self.score, self.frame_count, direction,
+         self.death_frames, self.invincibility_frames) = reader.unpack('BIiqQBHI')
+        self.state = GameState(state)
+        self._prepared_arena = None
+        self.drawing_direction = _DIRECTION_DELTAS[direction] if direction < 4 else None
+        self.config = LevelConfig(*reader.unpack(_LEVEL_CONFIG_FORMAT))
+        has_next, = reader.unpack('?')
+        self.next_level_config = LevelConfig(*reader.unpack(_LEVEL_CONFIG_FORMAT)) if has_next else None
+        self.level_generator.last_archetypes = [ARCHETYPES[i] for i in reader.array('B')]
+        seed, = reader.unpack('Q')
+        self.streams = RandomStreams(seed)
+        self.level_generator.rng = self.streams.level
+        # Building the arena spawns enemies from the enemy stream; the saved states
+        # of the streams and of the enemies are loaded over it below
+        arena = self.arena = create_arena(self.config, self.game_config.arena_backend, self.streams.enemies)
+        for name in self._STREAMS:
+            reader.random_state(getattr(self.streams, name))
+
+        cells = _rle_decode(reader.array('B'), reader.array('I'))
+        walls = list(zip(reader.array('H'), reader.array('H')))
+        free_regions, = reader.unpack('i')
+        player = arena.player
+        player.x, player.y, player.is_drawing, player.drawing_completed = reader.unpack('HH??')
+        for x, y in zip(reader.array('H'), reader.array('H')):
+            player.path.add_position(x, y)
+        arena._restore_cells(cells, walls, None if free_regions == -1 else free_regions)
+        for values in (arena.line_swarm.x, arena.line_swarm.y, arena.line_swarm.direction):
+            values[:] = reader.array('i')
+        for field in ArenaEnemySwarm.__slots__[1:]:
+            getattr(arena.arena_swarm, field)[:] = reader.array('i')
+        arena.arena_swarm.intersected[:] = map(bool, arena.arena_swarm.intersected)
         self.fuse = None
-        self.death_animation_frames = 0
-        self.death_particles = []
-        self.invincibility_frames = 0
-        self.canvas.create_new_drawing_surface()
+        has_fuse, = reader.unpack('?')
+        if has_fuse:
+            x, y, path_index, delay, active = reader.unpack('HHII?')
+            self.fuse = FuseEnemy(player.path, x, y, delay)
+            self.fuse.path_index = path_index
+            self.fuse.active = active
 
-    def handle_keyboard_input(self):
-        keys = pygame.key.get_pressed()
+    def _emit(self, event_type, *data):
+        self._events.append(Event(event_type, data))
+
+    def _invincibility_duration(self):
+        return int(self.game_config.invincibility_seconds * self.game_config.fps)
+
+    def _handle_actions(self, actions):
         d = self.drawing_direction
-        if keys[pygame.K_UP] and d != (0, -1): self._move(0, -1)
-        if keys[pygame.K_LEFT] and d != (-1, 0): self._move(-1, 0)
-        if keys[pygame.K_RIGHT] and d != (1, 0): self._move(1, 0)
-        if keys[pygame.K_DOWN] and d != (0, 1): self._move(0, 1)
-        if keys[pygame.K_SPACE]:
-            was_drawing = self.arena.player.is_drawing
-            self.arena.player.initiate_drawing()
-            if not was_drawing and self.arena.player.is_drawing:
+        if actions & Action.UP and d != (0, -1): self._move(0, -1)
+        if actions & Action.LEFT and d != (-1, 0): self._move(-1, 0)
+        if actions & Action.RIGHT and d != (1, 0): self._move(1, 0)
+        if actions & Action.DOWN and d != (0, 1): self._move(0, 1)
+        if actions & Action.DRAW and self.death_frames == 0 and self.state == GameState.PLAYING:
+            player = self.arena.player
+            was_drawing = player.is_drawing
+            player.initiate_drawing()
+            if not was_drawing and player.is_drawing:
                 self._try_spawn_fuse()
 
     def _move(self, dx, dy):
         """Attempt to move the player by (dx, dy) and handle drawing/failure."""
-        result = self.arena.player.try_move(dx, dy)
+        if self.death_frames > 0 or self.state != GameState.PLAYING:
+            return
+        player = self.arena.player
+        result = player.try_move(dx, dy)
         if result == MoveResult.OK:
-            if self.arena.player.is_drawing:
-                player = self.arena.player
+            if player.is_drawing:
                 self.drawing_direction = (dx, dy)
-                self.canvas.create_line_arena(player.x - dx, player.y - dy, player.x, player.y)
+                self._emit(EventType.LINE_DRAWN, player.x - dx, player.y - dy, player.x, player.y)
                 if player.drawing_completed:
-                    self.fill_arena()
+                    self._fill_arena()
                     self.drawing_direction = None
         elif result == MoveResult.DIED:
-            self.player_failed()
+            self._player_failed('drawing')
 
     def _try_spawn_fuse(self):
         """Possibly spawn a fuse at the player's current position based on level config."""
-        if self.config.fuse_speed > 0 and random.random() < self.config.fuse_chance:
+        if self.config.fuse_speed > 0 and self.streams.fuse.random() < self.config.fuse_chance:
             player = self.arena.player
             self.fuse = FuseEnemy(player.path, player.x, player.y, delay=self.config.fuse_delay)
             logger.debug("Fuse spawned at (%d,%d) with delay=%d", player.x, player.y, self.config.fuse_delay)
 
-    def move_and_render_fuse(self):
-        """Move the fuse along the player's drawing path and render it."""
-        if self.fuse is None or not self.fuse.active:
-            return
-        if self.frame_count % self.config.player_speed == 0:
-            caught = self.fuse.move(steps=self.config.fuse_speed)
-            if caught:
-                logger.debug("Fuse caught the player")
-                self.player_failed()
-                return
-        color = self.fuse.get_color(self.frame_count)
-        self.canvas.create_dot_arena(self.fuse.x, self.fuse.y, rad=4, color=color)
-
-    def fill_arena(self):
-        percent_before = self.arena.filled_percent
-        path_length = len(self.arena.player.path.get_positions())
-        was_filled = self.arena.fill_arena(fill_callback=self.canvas.create_arena_rect)
-        if was_filled:
-            self.canvas.complete_drawing()
-        self.canvas.create_new_drawing_surface()
+    def _fill_arena(self):
+        arena = self.arena
+        percent_before = arena.filled_percent
+        path_length = len(arena.player.path)
+        spans = []
+        was_filled = arena.fill_arena_spans(lambda *span: spans.append(span))
+        self._emit(EventType.ARENA_FILLED, spans, was_filled)
         self.fuse = None
         # Score: percentage gained * 1000 + path length * 5
-        percent_gained = self.arena.filled_percent - percent_before
+        percent_gained = arena.filled_percent - percent_before
         self.score += int(percent_gained * 1000) + path_length * 5
-        self.check_level_complete()
+        self._check_level_complete()
 
-    def check_level_complete(self):
+    def _check_level_complete(self):
         """Check if the current level's fill target has been reached."""
-        if self.arena.filled_percent >= self.config.fill_percent:
+        filled = self.arena.filled_percent
+        if filled >= self.config.fill_percent:
             # Calculate bonuses
-            excess = self.arena.filled_percent - self.config.fill_percent
-            self.level_complete_lives_bonus = self.lives * 1000
-            self.level_complete_excess_bonus = int(excess * 1000)
-            self.score += self.level_complete_lives_bonus + self.level_complete_excess_bonus
-            self.level_complete_filled = self.arena.filled_percent
+            excess = filled - self.config.fill_percent
+            lives_bonus = self.lives * 1000
+            excess_bonus = int(excess * 1000)
+            self.score += lives_bonus + excess_bonus
             logger.debug("Level %d complete! (%.0f%% filled, score: %d)",
-                         self.config.level_number, self.arena.filled_percent * 100, self.score)
-            # Capture the current arena scene as background for transition
-            self.canvas.render_arena()
-            self.render_line_enemies()
-            self.render_arena_enemies()
-            self.render_player()
-            self.canvas.draw_hud(
-                level=self.config.level_number,
-                fill_percent=self.arena.filled_percent,
-                fill_target=self.config.fill_percent,
-                score=self.score,
-                lives=self.lives,
-            )
-            self.transition_snapshot = self.canvas.screen.copy()
-            # Pre-generate next level config for tagline
+                         self.config.level_number, filled * 100, self.score)
             self.next_level_config = self.level_generator.build_level(self.current_level + 1)
-            self.next_level_tagline = self._build_tagline(self.config, self.next_level_config)
-            # Show transition screen
             self.state = GameState.LEVEL_TRANSITION
+            self._emit(EventType.LEVEL_COMPLETE, filled, excess_bonus, lives_bonus)
+
+    def _move_line_enemies(self):
+        player = self.arena.player
+        swarm = self.arena.line_swarm
+        prev_xs, prev_ys = swarm.x[:], swarm.y[:]
+        swarm.step()
+        if self.invincibility_frames > 0:
+            return  # skip collision check during invincibility
+        for ex, ey, prev_ex, prev_ey in zip(swarm.x, swarm.y, prev_xs, prev_ys):
+            on_same_cell = (ex == player.x and ey == player.y)
+            enemy_was_on_player = (prev_ex == player.x and prev_ey == player.y)
+            if on_same_cell or enemy_was_on_player:
+                logger.debug("Line enemy hit player")
+                self._player_failed('line_enemy')
+                return
+
+    def _move_arena_enemies(self):
+        swarm = self.arena.arena_swarm
+        swarm.step()
+        self._emit(EventType.STICKS_MOVED)
+        if any(swarm.intersected):
+            logger.debug("Arena enemy intersected with player drawing")
+            self._player_failed('arena_enemy')
+
+    def _move_fuse(self):
+        """Move the fuse along the player's drawing path."""
+        if self.fuse is None or not self.fuse.active:
+            return
+        if self.frame_count % self.config.player_speed == 0:
+            caught = self.fuse.move(steps=self.config.fuse_speed)
+            if caught:
+                logger.debug("Fuse caught the player")
+                self._player_failed('fuse')
+
+    def _player_failed(self, cause):
+        """Lose a life and start the death sequence. Arena state is cleaned up immediately;
+        the player respawns (or the game ends) once the sequence is over."""
+        if self.death_frames > 0:
+            return  # already dying, ignore further collisions
+        player = self.arena.player
+        self.arena.change_player_path_state_to(CellState.FREE)
+        self.fuse = None
+        self.drawing_direction = None
+        self.lives -= 1
+        if self.lives <= 0:
+            logger.debug("Game over!")
+        self.death_frames = self.DEATH_FRAMES
+        self._emit(EventType.PLAYER_DIED, player.x, player.y, cause)
+
+    def _finish_death(self):
+        """Complete the death sequence: reset player or end the game."""
+        if self.lives <= 0:
+            self.state = GameState.GAME_OVER
+            self._emit(EventType.GAME_OVER, self.score)
+            return
+        self.arena.player.reset_player_state()
+        self.invincibility_frames = self._invincibility_duration()
+        self._emit(EventType.PLAYER_RESPAWNED)
+
+
+def _write_atomic(path, data):
+    """Write data to path via a temporary file in the same directory and os.replace,
+    so readers see either the old file or the complete new one."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.pystix-', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+class BackgroundWriter(object):
+    """Writes files atomically on a daemon thread, in the order requested, so the game
+    loop never waits for the disk. flush() waits for the pending writes."""
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='pystix-writer', daemon=True)
+        self._thread.start()
+
+    def write(self, path, data):
+        self._queue.put((path, data))
+
+    def remove(self, path):
+        self._queue.put((path, None))
+
+    def flush(self):
+        self._queue.join()
+
+    def _run(self):
+        while True:
+            path, data = self._queue.get()
+            try:
+                if data is None:
+                    if os.path.exists(path):
+                        os.remove(path)
+                else:
+                    _write_atomic(path, data)
+            except OSError:
+                logger.warning("Could not write %s", path)
+            finally:
+                self._queue.task_done()
+
+
+class Replay(object):
+    """A recorded game: the seed and settings it was played with, plus the Actions
+    passed to Simulation.step, one byte per tick.
+
+    On disk it is a fixed header followed by the zlib-compressed action bytes;
+    held keys make long runs of equal bytes, so a game compresses to a few KB."""
+    __slots__ = ('seed', 'starting_lives', 'fps', 'invincibility_seconds', 'swarm_size', 'actions')
+    MAGIC = b'PSRP'
+    VERSION = 1
+    _HEADER = struct.Struct('<4sBQBHdH')  # magic, version, seed, lives, fps, invincibility, swarm size
+
+    def __init__(self, seed, game_config, actions=b''):
+        self.seed = seed
+        self.starting_lives = game_config.starting_lives
+        self.fps = game_config.fps
+        self.invincibility_seconds = game_config.invincibility_seconds
+        self.swarm_size = game_config.swarm_size
+        self.actions = bytearray(actions)
+
+    def __len__(self):
+        return len(self.actions)
+
+    def record(self, actions):
+        """Append the Actions for one tick."""
+        self.actions.append(actions)
+
+    def game_config(self):
+        """Return a GameConfig with the settings the recording was made with."""
+        return GameConfig(starting_lives=self.starting_lives, fps=self.fps,
+                          invincibility_seconds=self.invincibility_seconds,
+                          swarm_size=self.swarm_size, seed=self.seed)
+
+    def to_bytes(self):
+        header = self._HEADER.pack(self.MAGIC, self.VERSION, self.seed, self.starting_lives,
+                                   self.fps, self.invincibility_seconds, self.swarm_size)
+        return header + zlib.compress(self.actions, 9)
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Parse a replay written by to_bytes. Raises ValueError if it is not one."""
+        if len(data) < cls._HEADER.size:
+            raise ValueError("Replay data is truncated")
+        magic, version, seed, lives, fps, invincibility, swarm_size = cls._HEADER.unpack_from(data)
+        if magic != cls.MAGIC or version != cls.VERSION:
+            raise ValueError("Not a pystix replay (or an unsupported version)")
+        game_config = GameConfig(starting_lives=lives, fps=fps,
+                                 invincibility_seconds=invincibility, swarm_size=swarm_size)
+        try:
+            actions = zlib.decompress(data[cls._HEADER.size:])
+        except zlib.error as e:
+            raise ValueError(f"Corrupt replay actions: {e}") from None
+        return cls(seed, game_config, actions)
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            return cls.from_bytes(f.read())
+
+
+@dataclass(slots=True)
+class ReplayResult:
+    """Outcome of run_replay."""
+    score: int
+    level: int                 # level reached
+    level_frames: list         # ticks spent on each level, in order
+    state: GameState           # GAME_OVER if the recording ran to the end of the game
+    seconds: float             # wall-clock time the replay took
+
+
+def run_replay(replay, arena_backend='auto'):
+    """Re-run a recorded game headless, as fast as possible. Level transitions are
+    skipped straight to the next level, as they take no input."""
+    game_config = replay.game_config()
+    game_config.arena_backend = arena_backend
+    sim = Simulation(game_config)
+    start = time.perf_counter()
+    sim.start_new_game(replay.seed)
+    level_frames = []
+    step = sim.step
+    for actions in replay.actions:
+        if sim.state == GameState.LEVEL_TRANSITION:
+            level_frames.append(sim.frame_count)
+            sim.advance_to_next_level()
+        step(actions)
+    level_frames.append(sim.frame_count)
+    return ReplayResult(score=sim.score, level=sim.current_level, level_frames=level_frames,
+                        state=sim.state, seconds=time.perf_counter() - start)
+
+
+class ReplayCursor(object):
+    """Plays a Replay forward on a Simulation and keeps a snapshot every
+    keyframe_interval ticks, so that seek() to any tick already played restores
+    the nearest earlier keyframe and re-simulates fewer than keyframe_interval ticks."""
+
+    def __init__(self, replay, keyframe_interval=600, arena_backend='auto'):
+        game_config = replay.game_config()
+        game_config.arena_backend = arena_backend
+        self.replay = replay
+        self.keyframe_interval = keyframe_interval
+        self.simulation = Simulation(game_config)
+        self.simulation.start_new_game(replay.seed)
+        self.tick = 0  # index of the next recorded tick to play
+        self.keyframes = {0: self.simulation.snapshot()}
+
+    def __len__(self):
+        return len(self.replay)
+
+    def step(self):
+        """Play the next recorded tick and return its events."""
+        sim = self.simulation
+        if sim.state == GameState.LEVEL_TRANSITION:
+            sim.advance_to_next_level()  # transitions take no input
+        events = sim.step(self.replay.actions[self.tick])
+        self.tick += 1
+        if self.tick % self.keyframe_interval == 0 and self.tick not in self.keyframes:
+            self.keyframes[self.tick] = sim.snapshot()
+        return events
+
+    def seek(self, tick):
+        """Move to the state just before recorded tick `tick` (len(self) for the end)."""
+        if not 0 <= tick <= len(self.replay):
+            raise IndexError(f"Tick {tick} is outside the recording (0-{len(self.replay)})")
+        keyframe = max(k for k in self.keyframes if k <= tick)
+        if not keyframe <= self.tick <= tick:
+            self.simulation.restore(self.keyframes[keyframe])
+            self.tick = keyframe
+        while self.tick < tick:
+            self.step()
+        return self.simulation
+
+
+class RandomBot(object):
+    """Bot that holds a random input for a random number of ticks."""
+    __slots__ = ('rng', 'action', 'hold')
+    ACTIONS = (Action.UP, Action.DOWN, Action.LEFT, Action.RIGHT, Action.DRAW | Action.UP,
+               Action.DRAW | Action.DOWN, Action.DRAW | Action.LEFT, Action.DRAW | Action.RIGHT)
+
+    def __init__(self, rng):
+        self.rng = rng
+        self.action = Action.NONE
+        self.hold = 0
+
+    def __call__(self, sim):
+        if self.hold == 0:
+            self.action = self.rng.choice(self.ACTIONS)
+            self.hold = self.rng.randint(1, 20)
+        self.hold -= 1
+        return self.action
+
+
+class SweepBot(object):
+    """Scripted bot that sweeps the arena with vertical lines: it walks a few cells
+    along the top or bottom wall, then draws straight across to the opposite one.
+    When that is not possible it falls back to random input for a while."""
+    __slots__ = ('rng', 'fallback', 'stride', 'walked', 'heading')
+
+    def __init__(self, rng):
+        self.rng = rng
+        self.fallback = RandomBot(rng)
+        self.stride = rng.randint(3, 8)
+        self.walked = 0
+        self.heading = Action.DOWN
+
+    def __call__(self, sim):
+        player = sim.arena.player
+        if sim.death_frames > 0:
+            return Action.NONE
+        if player.is_drawing:
+            # Take the first step; from then on the drawing direction carries the player across
+            return self.heading if sim.drawing_direction is None else Action.NONE
+        if self.fallback.hold > 0:
+            return self.fallback(sim)
+        on_top = player.y == 0
+        if not (on_top or player.y == sim.arena.arena_height - 1):
+            return self.fallback(sim)
+        if self.walked < self.stride and player.x < sim.arena.arena_width - 2:
+            self.walked += 1
+            return Action.RIGHT
+        self.walked = 0
+        self.stride = self.rng.randint(3, 8)
+        if not player.is_possible_to_draw():
+            return self.fallback(sim)
+        if self._stick_nearby(sim.arena, player.x):
+            self.walked = -self.stride  # keep walking and try further along
+            return Action.RIGHT if player.x < sim.arena.arena_width - 2 else self.fallback(sim)
+        self.heading = Action.DOWN if on_top else Action.UP
+        return Action.DRAW
+
+    @staticmethod
+    def _stick_nearby(arena, x, margin=10):
+        """True if an arena enemy's stick spans columns within margin of x."""
+        swarm = arena.arena_swarm
+        for x1, x2 in zip(swarm.end1_x, swarm.end2_x):
+            if min(x1, x2) - margin <= x <= max(x1, x2) + margin:
+                return True
+        return False
+
+
+BOTS = {'random': RandomBot, 'sweep': SweepBot}
+
+
+def simulate_game(seed, bot='sweep', max_ticks=50000, swarm_size=0):
+    """Play one headless game with a bot. Returns one (level, archetype, frames, deaths,
+    completed) tuple per level played; the game ends at game over or max_ticks."""
+    sim = Simulation(GameConfig(seed=seed, swarm_size=swarm_size, arena_backend='python'))
+    sim.start_new_game()
+    player = BOTS[bot](sim.streams.stream('bot'))
+    levels = []
+    archetype = sim.level_generator.last_archetypes[-1]
+    deaths = 0
+    for _ in range(max_ticks):
+        if sim.state == GameState.LEVEL_TRANSITION:
+            levels.append((sim.current_level, archetype, sim.frame_count, deaths, True))
+            sim.advance_to_next_level()
+            archetype = sim.level_generator.last_archetypes[-1]
+            deaths = 0
+        elif sim.state != GameState.PLAYING:
+            break
+        for event in sim.step(player(sim)):
+            if event.type == EventType.PLAYER_DIED:
+                deaths += 1
+    if sim.state != GameState.LEVEL_TRANSITION:
+        levels.append((sim.current_level, archetype, sim.frame_count, deaths, False))
+    return levels
+
+
+def _quiet_worker():
+    logger.setLevel(logging.WARNING)  # per-event debug logging would dominate the run
+
+
+def run_batch(games, bot='sweep', processes=None, base_seed=0, max_ticks=50000, swarm_size=0):
+    """Run simulate_game for seeds base_seed..base_seed+games-1 across a process pool
+    (processes=None uses every core) and aggregate the results per archetype:
+    {archetype: {'played', 'completed', 'completion_rate', 'avg_frames', 'deaths',
+    'deaths_per_level'}}, where avg_frames averages over completed levels."""
+    job = functools.partial(simulate_game, bot=bot, max_ticks=max_ticks, swarm_size=swarm_size)
+    seeds = range(base_seed, base_seed + games)
+    with multiprocessing.Pool(processes, initializer=_quiet_worker) as pool:
+        results = pool.map(job, seeds, chunksize=max(1, games // (4 * (processes or os.cpu_count() or 1))))
+    totals = {}
+    for levels in results:
+        for _, archetype, frames, deaths, completed in levels:
+            stats = totals.setdefault(archetype, {'played': 0, 'completed': 0, 'frames': 0, 'deaths': 0})
+            stats['played'] += 1
+            stats['deaths'] += deaths
+            if completed:
+                stats['completed'] += 1
+                stats['frames'] += frames
+    report = {}
+    for archetype, stats in sorted(totals.items()):
+        report[archetype] = {
+            'played': stats['played'],
+            'completed': stats['completed'],
+            'completion_rate': stats['completed'] / stats['played'],
+            'avg_frames': stats['frames'] / stats['completed'] if stats['completed'] else 0.0,
+            'deaths': stats['deaths'],
+            'deaths_per_level': stats['deaths'] / stats['played'],
+        }
+    return report
+
+
+class VectorEnv(object):
+    """K independent games stepped in lockstep, for bots.
+
+    Every environment plays the same LevelConfig. An episode ends when the level is
+    completed or the lives run out, and that environment restarts at once with the
+    next seed. Observations are the K arenas' cell codes (CellState values) stacked
+    into one (K, height, width) uint8 array, a numpy array when NumPy is installed
+    and a memoryview otherwise, which every step overwrites in place."""
+
+    def __init__(self, num_envs, config, game_config=None, seed=0):
+        self.config = config
+        self.game_config = game_config if game_config is not None else GameConfig(arena_backend='python')
+        self.num_envs = num_envs
+        self.next_seed = seed
+        self.simulations = [Simulation(self.game_config) for _ in range(num_envs)]
+        self._cell_count = config.arena_width * config.arena_height
+        self._buffer = bytearray(num_envs * self._cell_count)
+        shape = (num_envs, config.arena_height, config.arena_width)
+        if np is not None:
+            self.observations = np.frombuffer(self._buffer, dtype=np.uint8).reshape(shape)
+        else:
+            self.observations = memoryview(self._buffer).cast('B', shape)
+
+    def __len__(self):
+        return self.num_envs
+
+    def reset(self):
+        """Start a new episode in every environment. Returns the observations."""
+        for i in range(self.num_envs):
+            self._reset_env(i)
+        return self.observations
+
+    def step(self, actions):
+        """Advance every environment one tick; actions holds one Action per environment
+        (any sequence of ints, e.g. a numpy array). Returns (observations, rewards, dones):
+        rewards are the score gained this tick, and a done environment has already been
+        reset, so its observation is the first one of its next episode."""
+        if hasattr(actions, 'tolist'):
+            actions = actions.tolist()
+        if len(actions) != self.num_envs:
+            raise ValueError(f"expected {self.num_envs} actions, got {len(actions)}")
+        n = self._cell_count
+        buffer = self._buffer
+        rewards = [0] * self.num_envs
+        dones = [False] * self.num_envs
+        for i, (sim, action) in enumerate(zip(self.simulations, actions)):
+            score = sim.score
+            sim.step(action)
+            rewards[i] = sim.score - score
+            if sim.state != GameState.PLAYING:
+                dones[i] = True
+                self._reset_env(i)
+            else:
+                buffer[i * n:(i + 1) * n] = sim.arena._cells
+        return self.observations, rewards, dones
+
+    def _reset_env(self, i):
+        self.simulations[i].start_new_game(self.next_seed, self.config)
+        self.next_seed += 1
+        n = self._cell_count
+        self._buffer[i * n:(i + 1) * n] = self.simulations[i].arena._cells
+
+
+class FixedTimestep(object):
+    """Accumulator that turns elapsed wall-clock time into a whole number of fixed-length
+    simulation ticks, so the simulation runs at the same rate however fast frames render."""
+    __slots__ = ('tick_seconds', 'max_ticks', 'accumulator')
+
+    def __init__(self, ticks_per_second, max_ticks=5):
+        self.tick_seconds = 1.0 / ticks_per_second
+        self.max_ticks = max_ticks
+        self.accumulator = 0.0
+
+    def advance(self, elapsed):
+        """Add elapsed seconds and return how many ticks are due. A renderer that falls far
+        behind gets at most max_ticks; the rest of the backlog is dropped rather than
+        letting catch-up work snowball."""
+        self.accumulator += elapsed
+        ticks = int(self.accumulator / self.tick_seconds)
+        if ticks > self.max_ticks:
+            ticks = self.max_ticks
+            self.accumulator = 0.0
+        else:
+            self.accumulator -= ticks * self.tick_seconds
+        return ticks
+
+
+class Game(object):
+    """pygame front end: turns the keyboard into Actions for a Simulation and renders
+    its state and events (player, enemies, fills, explosions) to the screen."""
+    def __init__(self, canvas, game_config):
+        self.canvas = canvas
+        self.game_config = game_config
+        self.simulation = Simulation(game_config)
+        self.high_score = self._load_high_score()
+        self.state = GameState.TITLE
+        self.running = True
+        self.frame_count = 0
+        self.last_n_lines = []
+        self.death_particles = []
+        self.recording = None
+        self.saver = BackgroundWriter()
+        self.ticks_since_save = 0
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix='pystix-level')
+        self.next_level = None  # Future of the next level's surfaces during LEVEL_TRANSITION
+        # Set initial window size for title screen
+        self.canvas.screen = pygame.display.set_mode(
+            (game_config.max_window_width, game_config.max_window_height))
+
+    def _load_high_score(self):
+        path = self.game_config.high_score_file
+        if os.path.exists(path):
+            try:
+                with open(path, 'r') as f:
+                    data = json.load(f)
+                    return data.get('high_score', 0)
+            except (json.JSONDecodeError, OSError):
+                pass
+        return 0
+
+    def _save_high_score(self):
+        path = self.game_config.high_score_file
+        try:
+            with open(path, 'w') as f:
+                json.dump({'high_score': self.high_score}, f)
+        except OSError:
+            logger.warning("Could not save high score to %s", path)
+
+    def _start_new_game(self):
+        """Reset all game state and start level 1."""
+        self.simulation.start_new_game()
+        self.recording = Replay(self.simulation.streams.seed, self.game_config)
+        self.state = GameState.PLAYING
+        self._start_level_display()
+
+    def _save_recording(self):
+        """Write the current game's inputs to game_config.replay_file, if enabled."""
+        path = self.game_config.replay_file
+        if path and self.recording is not None:
+            self.saver.write(path, self.recording.to_bytes())
+
+    def _save_game(self):
+        """Save the game in progress to game_config.save_file, if enabled. Only taking the
+        snapshot happens here; the file is written in the background."""
+        self.ticks_since_save = 0
+        path = self.game_config.save_file
+        if path:
+            self.saver.write(path, self.simulation.snapshot())
+
+    def _can_resume(self):
+        path = self.game_config.save_file
+        return bool(path) and os.path.exists(path)
+
+    def _resume_game(self):
+        """Continue the game saved in game_config.save_file."""
+        sim = self.simulation
+        try:
+            with open(self.game_config.save_file, 'rb') as f:
+                sim.restore(f.read())
+        except (OSError, ValueError, struct.error, zlib.error):
+            logger.warning("Could not resume the saved game from %s", self.game_config.save_file)
+            return
+        if sim.state == GameState.LEVEL_TRANSITION:
+            sim.advance_to_next_level()
+        self.recording = None  # a replay has to start from level 1
+        self.ticks_since_save = 0
+        self.state = GameState.PLAYING
+        self._start_level_display()
+        self._redraw_arena()
+
+    def _redraw_arena(self):
+        """Draw the arena's current cells from scratch: FILLED spans, the lines of earlier
+        paths (interior WALL runs) and the path being drawn."""
+        arena = self.simulation.arena
+        w, h = arena.arena_width, arena.arena_height
+        cells = arena._cells
+        filled = bytes((_FILLED,))
+        wall = bytes((_WALL,))
+        for y in range(1, h - 1):
+            row = cells[y * w:(y + 1) * w]
+            for run in re.finditer(re.escape(filled) + b'+', row):
+                self.canvas.create_arena_span(y, run.start(), run.end() - 1)
+            for run in re.finditer(re.escape(wall) + b'{2,}', row[1:-1]):
+                # The run's cells are 1..end of the row; lines run on to the walls they join
+                self.canvas.create_line_arena(run.start(), y, run.end() + 1, y)
+        for x in range(1, w - 1):
+            column = cells[x::w]
+            for run in re.finditer(re.escape(wall) + b'{2,}', column[1:-1]):
+                self.canvas.create_line_arena(x, run.start(), x, run.end() + 1)
+        self.canvas.complete_drawing()
+        self.canvas.create_new_drawing_surface()
+        path = arena.player.path
+        if arena.player.is_drawing:
+            for i in range(1, len(path)):
+                self.canvas.create_line_arena(*path[i - 1], *path[i])
+
+    def _start_level_display(self, surfaces=None):
+        """Size the window and switch to fresh surfaces (built now unless prepared
+        ahead) for the simulation's current level."""
+        config = self.simulation.config
+        self.canvas.configure(config.arena_width, config.arena_height, surfaces)
+        self.last_n_lines = []
+        self.death_particles = []
+
+    def read_actions(self):
+        """Return the Actions for the keys currently held down."""
+        keys = pygame.key.get_pressed()
+        actions = Action.NONE
+        if keys[pygame.K_UP]: actions |= Action.UP
+        if keys[pygame.K_LEFT]: actions |= Action.LEFT
+        if keys[pygame.K_RIGHT]: actions |= Action.RIGHT
+        if keys[pygame.K_DOWN]: actions |= Action.DOWN
+        if keys[pygame.K_SPACE]: actions |= Action.DRAW
+        return actions
+
+    def handle_event(self, event):
+        """Render the effects of one simulation Event."""
+        if event.type == EventType.LINE_DRAWN:
+            self.canvas.create_line_arena(*event.data)
+        elif event.type == EventType.ARENA_FILLED:
+            spans, was_filled = event.data
+            for span in spans:
+                self.canvas.create_arena_span(*span)
+            if was_filled:
+                self.canvas.complete_drawing()
+            self.canvas.create_new_drawing_surface()
+        elif event.type == EventType.STICKS_MOVED:
+            self._record_sticks()
+        elif event.type == EventType.PLAYER_DIED:
+            x, y, cause = event.data
+            self.canvas.create_new_drawing_surface()
+            self._start_death_animation(*self.canvas.arena_to_pixel(x, y))
+        elif event.type == EventType.PLAYER_RESPAWNED:
+            self.canvas.create_new_drawing_surface()
+        elif event.type == EventType.LEVEL_COMPLETE:
+            self._show_level_complete(*event.data)
+        elif event.type == EventType.GAME_OVER:
+            self.death_particles = []
+            self._handle_game_over()
+
+    def _show_level_complete(self, filled, excess_bonus, lives_bonus):
+        """Capture the finished level as the transition background and switch to it."""
+        sim = self.simulation
+        self.level_complete_filled = filled
+        self.level_complete_excess_bonus = excess_bonus
+        self.level_complete_lives_bonus = lives_bonus
+        self.canvas.render_arena()
+        self.render_line_enemies()
+        self.render_arena_enemies()
+        self.render_player()
+        self.draw_hud()
+        self.transition_snapshot = self.canvas.screen.copy()
+        self.next_level_tagline = self._build_tagline(sim.config, sim.next_level_config)
+        self.state = GameState.LEVEL_TRANSITION
+        # Build the next level while the transition screen shows
+        self.next_level = self.executor.submit(self._prepare_next_level)
+
+    def _prepare_next_level(self):
+        """Worker thread: build the next level's arena and surfaces."""
+        config = self.simulation.next_level_config
+        self.simulation.prepare_next_level()
+        return self.canvas.prepare_surfaces(config.arena_width, config.arena_height)
 
     def _build_tagline(self, current, next_config):
         """Build a short tagline describing how the next level differs."""
@@ -785,110 +2637,96 @@ class Game(object):
         return " | ".join(hints[:3])  # max 3 hints
 
     def _advance_to_next_level(self):
-        """Start the pre-generated next level."""
-        self.current_level += 1
+        """Start the next level, prepared while the transition screen was showing."""
+        surfaces = self.next_level.result()
+        self.next_level = None
+        self.simulation.advance_to_next_level()
         self.state = GameState.PLAYING
-        self.start_level(self.next_level_config)
-
-    def move_and_render_line_enemies(self):
-        player = self.arena.player
-        for line_enemy in self.arena.line_enemies:
-            prev_ex, prev_ey = line_enemy.x, line_enemy.y
-            move_x, move_y = line_enemy.move()
-            self.canvas.create_dot_arena(line_enemy.x, line_enemy.y, color="red")
-            if self.invincibility_frames > 0:
-                continue  # skip collision check during invincibility
-            on_same_cell = (line_enemy.x == player.x and line_enemy.y == player.y)
-            enemy_was_on_player = (prev_ex == player.x and prev_ey == player.y)
-            if on_same_cell or enemy_was_on_player:
-                logger.debug("Line enemy hit player")
-                self.player_failed()
-                return
+        self._start_level_display(surfaces)
 
     def render_line_enemies(self):
-        """Render line enemies at their current position without moving them."""
-        for line_enemy in self.arena.line_enemies:
-            self.canvas.create_dot_arena(line_enemy.x, line_enemy.y, color="red")
+        """Render line enemies at their current position."""
+        swarm = self.simulation.arena.line_swarm
+        for ex, ey in zip(swarm.x, swarm.y):
+            self.canvas.create_dot_arena(ex, ey, color="red")
 
     def render_player(self):
-        player = self.arena.player
-        if self.invincibility_frames > 0:
+        sim = self.simulation
+        player = sim.arena.player
+        if sim.invincibility_frames > 0:
             # Flash: alternate white/transparent every 4 frames
-            if (self.frame_count // 4) % 2 == 0:
+            if (sim.frame_count // 4) % 2 == 0:
                 self.canvas.create_dot_arena(player.x, player.y, color=(200, 200, 255))
             # else: skip rendering (invisible flash frame)
         else:
             self.canvas.create_dot_arena(player.x, player.y)
 
-    def move_and_render_arena_enemies(self):
-        for enemy in self.arena.arena_enemies:
-            line_start, line_end, intersected = enemy.move()
-            pixel_line_start = self.canvas.arena_to_pixel(line_start[0], line_start[1])
-            pixel_line_end = self.canvas.arena_to_pixel(line_end[0], line_end[1])
-            if len(self.last_n_lines) > 25:
+    def _record_sticks(self):
+        """Add the arena enemies' current sticks to the trail of recent sticks."""
+        swarm = self.simulation.arena.arena_swarm
+        # Keep a trail of recent sticks, but always at least every stick's current position
+        max_lines = max(25, len(swarm))
+        for i in range(len(swarm)):
+            pixel_line_start = self.canvas.arena_to_pixel(swarm.end1_x[i], swarm.end1_y[i])
+            pixel_line_end = self.canvas.arena_to_pixel(swarm.end2_x[i], swarm.end2_y[i])
+            if len(self.last_n_lines) > max_lines:
                 self.last_n_lines.pop(0)
             self.last_n_lines.append((pixel_line_start, pixel_line_end))
-            if intersected:
-                logger.debug("Arena enemy intersected with player drawing")
-                self.player_failed()
-        # Render all recent stick lines
-        red_component = 5
-        for (start, end) in self.last_n_lines:
-            red_component += 8
-            self.canvas.create_stick_line(start, end, red_component)
 
     def render_arena_enemies(self):
-        """Render arena enemies at their current position without moving them."""
+        """Render the trail of recent arena enemy sticks."""
         red_component = 5
         for (start, end) in self.last_n_lines:
             red_component += 8
             self.canvas.create_stick_line(start, end, red_component)
 
-    def player_failed(self):
-        """Start the death explosion animation. Resets game state immediately, delays respawn visually."""
-        if self.death_animation_frames > 0:
-            return  # already dying, ignore further collisions
-        player = self.arena.player
-        px, py = self.canvas.arena_to_pixel(player.x, player.y)
-        # Immediately clean up arena state to prevent re-triggering
-        self.arena.change_player_path_state_to(CellState.FREE)
-        self.canvas.create_new_drawing_surface()
-        self.fuse = None
-        self.drawing_direction = None
-        self.lives -= 1
-        if self.lives <= 0:
-            logger.debug("Game over!")
-        self._start_death_animation(px, py)
+    def render_fuse(self):
+        sim = self.simulation
+        if sim.fuse is None or not sim.fuse.active:
+            return
+        color = sim.fuse.get_color(sim.frame_count)
+        self.canvas.create_dot_arena(sim.fuse.x, sim.fuse.y, rad=4, color=color)
+
+    def draw_hud(self):
+        sim = self.simulation
+        self.canvas.draw_hud(
+            level=sim.config.level_number,
+            fill_percent=sim.arena.filled_percent,
+            fill_target=sim.config.fill_percent,
+            score=sim.score,
+            lives=sim.lives,
+        )
 
     def _handle_game_over(self):
         """Transition to game over state and update high score."""
-        if self.score > self.high_score:
-            self.high_score = self.score
+        score = self.simulation.score
+        if score > self.high_score:
+            self.high_score = score
             self._save_high_score()
+        self._save_recording()
+        if self.game_config.save_file:
+            self.saver.remove(self.game_config.save_file)
         self.state = GameState.GAME_OVER
 
     def _start_death_animation(self, px, py):
         """Create explosion particles at the given pixel position."""
-        self.death_animation_frames = 45
+        rng = self.simulation.streams.effects
         self.death_particles = []
         for _ in range(30):
-            angle = random.uniform(0, 2 * 3.14159)
-            speed = random.uniform(1.5, 6.0)
+            angle = rng.uniform(0, 2 * 3.14159)
+            speed = rng.uniform(1.5, 6.0)
             self.death_particles.append({
                 'x': float(px),
                 'y': float(py),
-                'vx': speed * random.uniform(-1, 1),
-                'vy': speed * random.uniform(-1, 1),
-                'life': random.randint(20, 45),
-                'radius': random.uniform(2.0, 5.0),
+                'vx': speed * rng.uniform(-1, 1),
+                'vy': speed * rng.uniform(-1, 1),
+                'life': rng.randint(20, 45),
+                'radius': rng.uniform(2.0, 5.0),
                 'color': (255, 255, 255),
             })
 
     def _update_death_animation(self):
-        """Advance the death animation by one frame. Returns True while still animating."""
-        if self.death_animation_frames <= 0:
-            return False
-        self.death_animation_frames -= 1
+        """Advance the explosion particles by one tick."""
         for p in self.death_particles:
             if p['life'] > 0:
                 p['x'] += p['vx']
@@ -902,115 +2740,129 @@ class Game(object):
                 g = max(0, min(255, int(255 * t * t)))
                 b = 0
                 p['color'] = (r, g, b)
-        self.canvas.render_explosion(self.death_particles)
-        return True
-
-    def _finish_death(self):
-        """Complete the death sequence: reset player or trigger game over."""
-        self.death_particles = []
-        self.death_animation_frames = 0
-        if self.lives <= 0:
-            self._handle_game_over()
-            return
-        self.arena.player.reset_player_state()
-        self.invincibility_frames = int(self.game_config.invincibility_seconds * self.game_config.fps)
-        self.canvas.create_new_drawing_surface()
 
     def loop(self):
+        """Render as fast as max_fps allows while simulating at a fixed game_config.fps
+        ticks per second: a slow frame runs several ticks, a fast one may run none."""
+        timestep = FixedTimestep(self.game_config.fps, self.game_config.max_catch_up_ticks)
+        previous = time.perf_counter()
         while self.running:
             self.running = self.canvas.check_for_exit()
+            now = time.perf_counter()
+            ticks = timestep.advance(now - previous)
+            previous = now
 
             if self.state == GameState.TITLE:
                 self._loop_title()
             elif self.state == GameState.PLAYING:
-                self._loop_playing()
+                self._loop_playing(ticks)
             elif self.state == GameState.LEVEL_TRANSITION:
                 self._loop_level_transition()
             elif self.state == GameState.GAME_OVER:
                 self._loop_game_over()
 
-            self.canvas.render_frame(self.game_config.fps)
+            self.canvas.render_frame(self.game_config.max_fps)
+            self.frame_count += ticks
+
+        if self.state in (GameState.PLAYING, GameState.LEVEL_TRANSITION):
+            # Quit mid-game: keep what was played, and the game to resume
+            self._save_recording()
+            self._save_game()
+        self.saver.flush()
+        self.executor.shutdown()
 
     def _loop_title(self):
-        """Render title screen. Press SPACE to start."""
+        """Render title screen. Press SPACE to start, or R to resume a saved game."""
+        can_resume = self._can_resume()
         self.canvas.screen.fill((0, 0, 0))
-        self.canvas.draw_title_screen(self.high_score)
+        self.canvas.draw_title_screen(self.high_score, can_resume)
         if self.canvas.space_pressed():
             self._start_new_game()
+        elif can_resume and self.canvas.key_pressed(pygame.K_r):
+            self._resume_game()
 
     def _loop_level_transition(self):
         """Show level complete stats overlaid on the captured arena snapshot. Press SPACE to continue."""
         self.canvas.screen.blit(self.transition_snapshot, (0, 0))
         self.canvas.draw_level_complete_screen(
-            level=self.config.level_number,
+            level=self.simulation.config.level_number,
             filled=self.level_complete_filled,
-            target=self.config.fill_percent,
+            target=self.simulation.config.fill_percent,
             excess_bonus=self.level_complete_excess_bonus,
             lives_bonus=self.level_complete_lives_bonus,
-            score=self.score,
+            score=self.simulation.score,
             tagline=self.next_level_tagline,
             frame_count=self.frame_count,
         )
-        self.frame_count += 1
         if self.canvas.space_pressed():
             self._advance_to_next_level()
 
     def _loop_game_over(self):
         """Show game over screen. Press SPACE to return to title."""
         self.canvas.screen.fill((0, 0, 0))
-        self.canvas.draw_game_over_screen(self.score, self.high_score)
+        self.canvas.draw_game_over_screen(self.simulation.score, self.high_score)
         if self.canvas.space_pressed():
             self.state = GameState.TITLE
 
-    def _loop_playing(self):
+    def _loop_playing(self, ticks=1):
+        """Run the simulation ticks due this frame, then render its current state."""
         self.canvas.render_arena()
-
-        # If death animation is playing, only render it and skip gameplay
-        if self.death_animation_frames > 0:
-            self._update_death_animation()
-            if self.death_animation_frames <= 0:
-                self._finish_death()
+        actions = self.read_actions()
+        for _ in range(ticks):
+            if self.simulation.death_frames > 0:
+                self._update_death_animation()
+            if self.recording is not None:  # a resumed game is not recorded
+                self.recording.record(actions)
+            for event in self.simulation.step(actions):
+                self.handle_event(event)
+            if self.state != GameState.PLAYING:
+                return
+        self.ticks_since_save += ticks
+        if self.ticks_since_save >= self.game_config.autosave_seconds * self.game_config.fps:
+            self._save_game()
+        # While the death sequence plays only the explosion is shown
+        if self.simulation.death_frames > 0:
+            self.canvas.render_explosion(self.death_particles)
         else:
-            # Player movement: auto-continue drawing direction + keyboard input
-            if self.frame_count % self.config.player_speed == 0:
-                if self.drawing_direction is not None:
-                    self._move(*self.drawing_direction)
-                self.handle_keyboard_input()
-
-            # Line enemies: move on their tick, render every frame
-            if self.frame_count % self.config.line_enemy_speed == 0:
-                self.move_and_render_line_enemies()
-            else:
-                self.render_line_enemies()
-
-            # Arena enemies: move on their tick, render every frame
-            if self.frame_count % self.config.arena_enemy_speed == 0:
-                self.move_and_render_arena_enemies()
-            else:
-                self.render_arena_enemies()
-
-            # Fuse: move and render if active
-            self.move_and_render_fuse()
-
+            self.render_line_enemies()
+            self.render_arena_enemies()
+            self.render_fuse()
             self.render_player()
-
-            if self.invincibility_frames > 0:
-                self.invincibility_frames -= 1
-
-        # Draw HUD
-        self.canvas.draw_hud(
-            level=self.config.level_number,
-            fill_percent=self.arena.filled_percent,
-            fill_target=self.config.fill_percent,
-            score=self.score,
-            lives=self.lives,
-        )
-        self.frame_count += 1
+        self.draw_hud()
+
+
+def _merge_rects(rects):
+    """Return the rects with each group of overlapping ones replaced by its bounding box,
+    so that no screen area is redrawn or updated twice."""
+    merged = []
+    for rect in rects:
+        rect = pygame.Rect(rect)
+        i = rect.collidelist(merged)
+        while i != -1:
+            rect.union_ip(merged.pop(i))
+            i = rect.collidelist(merged)
+        merged.append(rect)
+    return merged
+
+
+@dataclass(slots=True)
+class LevelSurfaces:
+    """A level's layout and surfaces, from PyGameCanvas.prepare_surfaces."""
+    arena_width: int
+    arena_height: int
+    cell_size: int
+    width: int
+    height: int
+    frame: object               # pygame.Rect of the arena border
+    arena_surface: object
+    drawing_surface: object
 
 
 class PyGameCanvas(object):
     """Canvas object that abstracts over pygame."""
     def __init__(self, game_config):
+        if pygame is None:
+            raise ImportError("pygame is required to display the game")
         pygame.init()
         self.max_width = game_config.max_window_width
         self.max_height = game_config.max_window_height
@@ -1023,25 +2875,63 @@ class PyGameCanvas(object):
         self.screen = pygame.display.set_mode((self.width, self.height))
         self.arena_surface = pygame.Surface((self.width, self.height))
         self.clock = pygame.time.Clock()
+        self._surfaces = _LRUCache(4)  # (arena width, arena height, cell size) -> LevelSurfaces
+        # Dirty rectangles: while playing, the screen is the arena and drawing surfaces with
+        # the sprites (dots, sticks, HUD) drawn on top, so a frame only has to restore the
+        # areas where last frame's sprites were and where the arena changed since.
+        self.dirty_rects = game_config.dirty_rects
+        self._screen_shows_arena = False  # screen is known to match the arena + _sprites
+        self._sprites = []          # screen areas drawn over the arena since it was rendered
+        self._arena_changes = []    # arena and drawing surface areas changed since then
+        self._drawing_bounds = None # area of the drawing surface that holds lines
+        self._updated_rects = None  # screen areas to update this frame (None = whole display)
         pygame.font.init()
         self.hud_font = pygame.font.SysFont('Consolas', 16)
 
-    def configure(self, arena_width, arena_height):
-        """Set cell_size (preferred, capped to fit max window) and resize window to match."""
-        self.arena_grid_width = arena_width
-        self.arena_grid_height = arena_height
+    def prepare_surfaces(self, arena_width, arena_height):
+        """Lay out a level and return its surfaces: the arena surface with just the frame
+        drawn, and an empty drawing surface. Surfaces are kept per layout in a small LRU
+        cache and cleared for reuse, as levels often repeat a size. Only the cache is
+        shared, so this can run on a worker thread ahead of configure() -- while the
+        previous level's surfaces are no longer drawn, as they may be the ones reused."""
         # Use preferred cell_size, but shrink if the arena would exceed max window
         max_cell_w = (self.max_width - 2 * self.margin) // max(arena_width - 1, 1)
         max_cell_h = (self.max_height - 2 * self.margin - self.hud_height) // max(arena_height - 1, 1)
-        self.cell_size = min(self.preferred_cell_size, max_cell_w, max_cell_h)
-        self.cell_size = max(1, self.cell_size)
-        # Resize window to fit the arena grid exactly
-        actual_w = (arena_width - 1) * self.cell_size + 2 * self.margin
-        actual_h = (arena_height - 1) * self.cell_size + 2 * self.margin + self.hud_height
-        self.width = actual_w
-        self.height = actual_h
-        self.screen = pygame.display.set_mode((actual_w, actual_h))
-        self.arena_surface = pygame.Surface((actual_w, actual_h))
+        cell_size = max(1, min(self.preferred_cell_size, max_cell_w, max_cell_h))
+
+        def build():
+            # Size the window to fit the arena grid exactly
+            width = (arena_width - 1) * cell_size + 2 * self.margin
+            height = (arena_height - 1) * cell_size + 2 * self.margin + self.hud_height
+            frame = pygame.Rect(self.margin, self.margin + self.hud_height,
+                                (arena_width - 1) * cell_size, (arena_height - 1) * cell_size)
+            return LevelSurfaces(arena_width, arena_height, cell_size, width, height, frame,
+                                 pygame.Surface((width, height)), pygame.Surface((width, height)))
+
+        surfaces = self._surfaces.get((arena_width, arena_height, cell_size), build)
+        surfaces.arena_surface.fill((0, 0, 0))
+        pygame.draw.rect(surfaces.arena_surface, pygame.Color('white'), surfaces.frame, 1)
+        surfaces.drawing_surface.fill((0, 0, 0))
+        return surfaces
+
+    def configure(self, arena_width, arena_height, surfaces=None):
+        """Switch to a level's layout and surfaces (prepared now if not given), resizing
+        the window only when its size changes."""
+        if surfaces is None:
+            surfaces = self.prepare_surfaces(arena_width, arena_height)
+        self.arena_grid_width = arena_width
+        self.arena_grid_height = arena_height
+        self.cell_size = surfaces.cell_size
+        if (surfaces.width, surfaces.height) != self.screen.get_size():
+            self.screen = pygame.display.set_mode((surfaces.width, surfaces.height))
+        self.width = surfaces.width
+        self.height = surfaces.height
+        self.arena_surface = surfaces.arena_surface
+        self.drawing_surface = surfaces.drawing_surface
+        self._screen_shows_arena = False
+        self._sprites = []
+        self._arena_changes = []
+        self._drawing_bounds = None
 
     def arena_to_pixel(self, ax, ay):
         """Convert arena coordinates to pixel coordinates."""
@@ -1049,48 +2939,61 @@ class PyGameCanvas(object):
                 self.margin + self.hud_height + ay * self.cell_size)
 
     def create_new_drawing_surface(self):
-        self.drawing_surface = pygame.Surface((self.width, self.height))
+        """Start a blank drawing surface (the current one, cleared where it was drawn on)."""
+        if self._drawing_bounds is not None:
+            self.drawing_surface.fill((0, 0, 0), self._drawing_bounds)
+            self._arena_changes.append(self._drawing_bounds)
+            self._drawing_bounds = None
+
+    def _sprite_drawn(self, rect):
+        """Note a screen area drawn over the arena; it is shown this frame and restored the next."""
+        self._sprites.append(rect)
+        if self._updated_rects is not None:
+            self._updated_rects.append(rect)
+        return rect
 
     def check_for_exit(self):
-        self._space_pressed_this_frame = False
+        self._keys_pressed_this_frame = set()
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 return False
-            if event.type == pygame.KEYDOWN and event.key == pygame.K_SPACE:
-                self._space_pressed_this_frame = True
+            if event.type == pygame.KEYDOWN:
+                self._keys_pressed_this_frame.add(event.key)
+            elif event.type == pygame.WINDOWEXPOSED:
+                self._screen_shows_arena = False  # the window needs a full update
         return True
 
+    def key_pressed(self, key):
+        """Return True if the key was pressed (not held) this frame."""
+        return key in self._keys_pressed_this_frame
+
     def space_pressed(self):
         """Return True if SPACE was pressed (not held) this frame."""
-        return self._space_pressed_this_frame
-
-    def create_arena_frame(self):
-        """Draw the arena perimeter rectangle matching the actual cell grid."""
-        top_left = self.arena_to_pixel(0, 0)
-        bottom_right = self.arena_to_pixel(self.arena_grid_width - 1, self.arena_grid_height - 1)
-        rect = pygame.Rect(top_left[0], top_left[1],
-                           bottom_right[0] - top_left[0],
-                           bottom_right[1] - top_left[1])
-        color = pygame.Color('white')
-        return pygame.draw.rect(self.arena_surface, color, rect, 1)
+        return self.key_pressed(pygame.K_SPACE)
 
     def create_dot_arena(self, ax, ay, rad=5, color='white'):
         """Draw a dot at arena coordinates."""
         px, py = self.arena_to_pixel(ax, ay)
         pos = pygame.Vector2(px, py)
         color_value = pygame.Color(color)
-        return pygame.draw.circle(self.screen, color_value, pos, rad)
+        return self._sprite_drawn(pygame.draw.circle(self.screen, color_value, pos, rad))
 
     def create_line_arena(self, ax1, ay1, ax2, ay2):
         """Draw a line between two arena coordinates."""
         start_pos = self.arena_to_pixel(ax1, ay1)
         end_pos = self.arena_to_pixel(ax2, ay2)
         color_param = pygame.Color('white')
-        return pygame.draw.line(self.drawing_surface, color_param, start_pos, end_pos)
+        rect = pygame.draw.line(self.drawing_surface, color_param, start_pos, end_pos)
+        if self._drawing_bounds is None:
+            self._drawing_bounds = rect.copy()
+        else:
+            self._drawing_bounds.union_ip(rect)
+        self._arena_changes.append(rect)
+        return rect
 
     def create_stick_line(self, start_pos, end_pos, red_component):
         color = pygame.Color(red_component, 0, 0)
-        return pygame.draw.line(self.screen, color, start_pos, end_pos)
+        return self._sprite_drawn(pygame.draw.line(self.screen, color, start_pos, end_pos))
 
     def create_arena_rect(self, ax, ay):
         """Fill a cell at arena coordinates."""
@@ -1098,12 +3001,25 @@ class PyGameCanvas(object):
         half = self.cell_size // 2
         color_fill = pygame.Color('darkgreen')
         rect = pygame.Rect(px - half, py - half, self.cell_size, self.cell_size)
-        return pygame.draw.rect(self.arena_surface, color_fill, rect)
+        rect = pygame.draw.rect(self.arena_surface, color_fill, rect)
+        self._arena_changes.append(rect)
+        return rect
+
+    def create_arena_span(self, ay, ax_start, ax_end):
+        """Fill a horizontal run of cells, ax_start to ax_end inclusive, with one rect."""
+        px, py = self.arena_to_pixel(ax_start, ay)
+        half = self.cell_size // 2
+        color_fill = pygame.Color('darkgreen')
+        rect = pygame.Rect(px - half, py - half,
+                           (ax_end - ax_start + 1) * self.cell_size, self.cell_size)
+        rect = pygame.draw.rect(self.arena_surface, color_fill, rect)
+        self._arena_changes.append(rect)
+        return rect
 
     def draw_text(self, x, y, text, size=14):
         font = pygame.font.SysFont('Consolas', size)
         text_canvas = font.render(text, True, (255, 255, 255))
-        return self.screen.blit(text_canvas, (x, y))
+        return self._sprite_drawn(self.screen.blit(text_canvas, (x, y)))
 
     def draw_hud(self, level, fill_percent, fill_target, score, lives):
         """Draw the HUD bar at the top of the screen."""
@@ -1118,24 +3034,41 @@ class PyGameCanvas(object):
         ]
         for text in texts:
             surface = self.hud_font.render(text, True, (255, 255, 255))
-            self.screen.blit(surface, (x, hud_y))
+            self._sprite_drawn(self.screen.blit(surface, (x, hud_y)))
             x += surface.get_width() + gap
 
     def complete_drawing(self):
-        self.arena_surface.blit(self.drawing_surface, (0, 0), special_flags=pygame.BLEND_ADD)
+        """Merge the lines on the drawing surface into the arena surface."""
+        if self._drawing_bounds is not None:
+            self.arena_surface.blit(self.drawing_surface, self._drawing_bounds, self._drawing_bounds,
+                                    special_flags=pygame.BLEND_ADD)
 
     def render_arena(self):
-        self.screen.blit(self.arena_surface, (0, 0))
-        self.screen.blit(self.drawing_surface, (0, 0), special_flags=pygame.BLEND_ADD)
+        """Draw the arena and drawing surfaces to the screen, under this frame's sprites.
+        In dirty-rect mode only the areas that changed since the last frame are redrawn,
+        once the screen shows the arena."""
+        if self.dirty_rects and self._screen_shows_arena:
+            dirty = _merge_rects(self._sprites + self._arena_changes)
+            for rect in dirty:
+                self.screen.blit(self.arena_surface, rect, rect)
+                self.screen.blit(self.drawing_surface, rect, rect, special_flags=pygame.BLEND_ADD)
+        else:
+            self.screen.blit(self.arena_surface, (0, 0))
+            self.screen.blit(self.drawing_surface, (0, 0), special_flags=pygame.BLEND_ADD)
+            dirty = [self.screen.get_rect()]
+        self._sprites = []
+        self._arena_changes = []
+        if self.dirty_rects:
+            self._updated_rects = (self._updated_rects or []) + dirty
 
     def render_explosion(self, particles):
         """Render explosion particles on screen."""
         for p in particles:
             if p['life'] > 0:
-                pygame.draw.circle(self.screen, p['color'],
-                                   (int(p['x']), int(p['y'])), max(1, int(p['radius'])))
+                self._sprite_drawn(pygame.draw.circle(self.screen, p['color'],
+                                   (int(p['x']), int(p['y'])), max(1, int(p['radius']))))
 
-    def draw_title_screen(self, high_score):
+    def draw_title_screen(self, high_score, can_resume=False):
         """Draw the title screen with game name, high score, and start prompt."""
         cx = self.width // 2
         cy = self.height // 2
@@ -1151,6 +3084,9 @@ class PyGameCanvas(object):
 
         prompt = prompt_font.render("Press SPACE to start", True, (150, 150, 150))
         self.screen.blit(prompt, (cx - prompt.get_width() // 2, cy + 60))
+        if can_resume:
+            prompt = prompt_font.render("Press R to resume your saved game", True, (150, 150, 150))
+            self.screen.blit(prompt, (cx - prompt.get_width() // 2, cy + 84))
 
     def draw_level_complete_screen(self, level, filled, target, excess_bonus, lives_bonus, score, tagline="", frame_count=0):
         """Draw the level complete stats overlaid on the arena."""
@@ -1217,13 +3153,82 @@ class PyGameCanvas(object):
         prompt = prompt_font.render("Press SPACE to continue", True, (150, 150, 150))
         self.screen.blit(prompt, (cx - prompt.get_width() // 2, cy + 80))
 
-    def render_frame(self, game_speed):
-        pygame.display.flip()
-        self.clock.tick(game_speed)
+    def render_frame(self, max_fps=0):
+        """Show the frame, waiting first if needed to stay under max_fps (0 = uncapped).
+        Only the dirty rectangles are updated when the frame rendered the arena in
+        dirty-rect mode; any other screen is shown whole and the next arena frame redrawn."""
+        if self._updated_rects is None:
+            pygame.display.flip()
+            self._screen_shows_arena = False
+        else:
+            pygame.display.update(_merge_rects(self._updated_rects))
+            self._updated_rects = None
+            self._screen_shows_arena = True
+        self.clock.tick(max_fps)
+
+
+def _seed_argument(text):
+    """argparse type for --seed: an int in the range RandomStreams accepts."""
+    seed = int(text)
+    if not 0 <= seed <= RandomStreams.MAX_SEED:
+        raise argparse.ArgumentTypeError(f"must be between 0 and {RandomStreams.MAX_SEED}")
+    return seed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pystix, a Qix-inspired game.")
+    parser.add_argument('--seed', type=_seed_argument, help="seed for a reproducible game")
+    parser.add_argument('--replay', metavar='FILE',
+                        help="re-run a recorded game headless at full speed and report the result")
+    parser.add_argument('--batch', type=int, metavar='N',
+                        help="simulate N bot games headless and report per-archetype statistics")
+    parser.add_argument('--bot', choices=sorted(BOTS), default='sweep', help="bot for --batch")
+    parser.add_argument('--processes', type=int, help="worker processes for --batch (default: all cores)")
+    parser.add_argument('--max-ticks', type=int, default=50000, help="tick limit per --batch game")
+    parser.add_argument('--swarm-size', type=int, default=0, help="extra enemies on every level")
+    parser.add_argument('--seek', type=int, metavar='TICK',
+                        help="with --replay, report the game state just before this tick")
+    args = parser.parse_args(argv)
+
+    if args.replay and args.seek is not None:
+        logger.setLevel(logging.WARNING)
+        sim = ReplayCursor(Replay.load(args.replay)).seek(args.seek)
+        print(f"Tick {args.seek}: level {sim.current_level} frame {sim.frame_count}  "
+              f"score {sim.score}  lives {sim.lives}  filled {sim.arena.filled_percent:.0%}  "
+              f"{sim.state.name}")
+        return
+
+    if args.batch:
+        logger.setLevel(logging.WARNING)
+        start = time.perf_counter()
+        report = run_batch(args.batch, bot=args.bot, processes=args.processes,
+                           base_seed=args.seed or 0, max_ticks=args.max_ticks,
+                           swarm_size=args.swarm_size)
+        print(f"{args.batch} games ({args.bot} bot) in {time.perf_counter() - start:.1f}s")
+        print(f"{'archetype':<12}{'played':>8}{'completed':>11}{'rate':>8}{'avg frames':>12}{'deaths/level':>14}")
+        for archetype, stats in report.items():
+            print(f"{archetype:<12}{stats['played']:>8}{stats['completed']:>11}"
+                  f"{stats['completion_rate']:>8.0%}{stats['avg_frames']:>12.0f}"
+                  f"{stats['deaths_per_level']:>14.2f}")
+        return
+
+    if args.replay:
+        logger.setLevel(logging.WARNING)  # per-event debug logging would dominate the run
+        replay = Replay.load(args.replay)
+        result = run_replay(replay)
+        print(f"Replayed {len(replay)} ticks in {result.seconds:.2f}s "
+              f"({len(replay) / max(result.seconds, 1e-9):.0f} ticks/s)")
+        print(f"Score: {result.score}  Level: {result.level}  "
+              f"{'Game over' if result.state == GameState.GAME_OVER else 'Game in progress'}")
+        for level, frames in enumerate(result.level_frames, 1):
+            print(f"  Level {level}: {frames} frames")
+        return
+
+    game_config = GameConfig(seed=args.seed, swarm_size=args.swarm_size)
+    canvas = PyGameCanvas(game_config)
+    game = Game(canvas, game_config)
+    game.loop()
 
 
 if __name__ == '__main__':
-    game_config = GameConfig()
-    canvas = PyGameCanvas(game_config)
-    game = Game(canvas, game_config)
-    game.loop()
\ No newline at end of file
+    main()
\ No newline at end of file
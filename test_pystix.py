@@ -1,12 +1,20 @@
 """Tests for pystix game logic.
 
 All tests exercise the model classes (Arena, Player, LineEnemy, ArenaEnemy)
-directly — no pygame dependency needed.
+directly — no pygame dependency needed, apart from the canvas rendering tests,
+which are skipped without it.
 """
+import dataclasses
+import random
+import zlib
 import pytest
+import pystix
 from pystix import (
     Arena, Player, LineEnemy, ArenaEnemy, FuseEnemy, LevelGenerator,
     CellState, MoveResult, LevelConfig, GameState, Path, ARCHETYPES,
+    NumpyArena, create_arena, Simulation, Action, EventType, GameConfig,
+    FixedTimestep, RandomStreams, Replay, run_replay, simulate_game, run_batch,
+    VectorEnv, ReplayCursor, BackgroundWriter,
 )
 
 
@@ -44,6 +52,17 @@ def noop_fill_callback(x, y):
     pass
 
 
+def draw_vertical_line(arena, x):
+    """Helper: draw a vertical line at column x from the top wall to the bottom wall."""
+    player = arena.player
+    for _ in range(x):
+        player.try_move(1, 0)
+    player.initiate_drawing()
+    for _ in range(arena.arena_height - 1):
+        player.try_move(0, 1)
+    assert player.drawing_completed is True
+
+
 # ---------------------------------------------------------------------------
 # Arena initialization
 # ---------------------------------------------------------------------------
@@ -76,6 +95,24 @@ class TestArenaInit:
         arena.set_cell(5, 5, CellState.FILLED)
         assert arena.get_cell(5, 5) == CellState.FILLED
 
+    def test_cells_buffer_holds_raw_codes(self):
+        arena = make_arena(10, 10)
+        assert isinstance(arena.cells, memoryview)
+        assert len(arena.cells) == 100
+        assert arena.cells[0] == int(CellState.WALL)
+        assert arena.cells[11] == int(CellState.FREE)
+        arena.set_cell(5, 5, CellState.DRAWING)
+        assert arena.cells[55] == int(CellState.DRAWING)
+
+    def test_free_position_skips_filled_rows(self):
+        arena = make_arena(10, 10)
+        assert arena.get_free_position() == (1, 1)
+        for y in range(1, 6):
+            for x in range(1, 9):
+                arena.set_cell(x, y, CellState.FILLED)
+        arena.set_cell(1, 6, CellState.DRAWING)
+        assert arena.get_free_position() == (2, 6)
+
     def test_player_starts_at_origin(self):
         arena = make_arena()
         assert arena.player.x == 0
@@ -484,6 +521,85 @@ class TestFillArena:
             assert arena.get_cell(x, y) == CellState.FREE, \
                 f"Cell ({x},{y}) should be FREE but is {arena.get_cell(x, y)}"
 
+    def test_enemy_in_smaller_region_fills_larger(self):
+        """Enemy-seeded fill keeps the enemy's region even when it is the smaller one."""
+        arena = make_arena(20, 20, num_arena_enemies=1)
+        enemy = arena.arena_enemies[0]
+        enemy.end1_x, enemy.end1_y, enemy.end2_x, enemy.end2_y = 2, 10, 3, 10
+        player = arena.player
+        for _ in range(5):
+            player.try_move(1, 0)
+        player.initiate_drawing()
+        for _ in range(19):
+            player.try_move(0, 1)
+        filled_cells = []
+        assert arena.fill_arena(lambda x, y: filled_cells.append((x, y))) is True
+        # Right side x=6..18, y=1..18 is filled, the enemy's side stays FREE
+        assert len(filled_cells) == 13 * 18
+        assert all(x >= 6 for x, y in filled_cells)
+        assert arena.get_cell(2, 10) == CellState.FREE
+        assert arena.get_cell(4, 1) == CellState.FREE
+
+    def test_enemy_on_drawn_cell_is_ignored(self):
+        """An enemy endpoint under the drawn path does not keep any region."""
+        arena = make_arena(20, 20, num_arena_enemies=1)
+        enemy = arena.arena_enemies[0]
+        enemy.end1_x, enemy.end1_y, enemy.end2_x, enemy.end2_y = 5, 10, 5, 11
+        draw_vertical_line(arena, 5)
+        filled_cells = []
+        arena.fill_arena(lambda x, y: filled_cells.append((x, y)))
+        # Falls back to keeping the largest region
+        assert len(filled_cells) == 4 * 18
+
+    def test_fill_reports_row_spans(self):
+        """fill_arena_spans reports one span per filled row segment."""
+        arena = make_arena(10, 10, num_arena_enemies=0)
+        draw_vertical_line(arena, 3)
+        spans = []
+        assert arena.fill_arena_spans(lambda y, x_start, x_end: spans.append((y, x_start, x_end)))
+        assert sorted(spans) == [(y, 1, 2) for y in range(1, 9)]
+
+    def test_corner_pocket_fills_only_pocket(self):
+        """Closing off a corner fills just the pocket next to the path."""
+        arena = make_arena(20, 20, num_arena_enemies=1)
+        player = arena.player
+        for _ in range(3):
+            player.try_move(1, 0)
+        player.initiate_drawing()
+        for _ in range(3):
+            player.try_move(0, 1)
+        for _ in range(3):
+            player.try_move(-1, 0)
+        assert player.drawing_completed is True
+        filled_cells = []
+        arena.fill_arena(lambda x, y: filled_cells.append((x, y)))
+        assert sorted(filled_cells) == [(1, 1), (1, 2), (2, 1), (2, 2)]
+        assert arena._free_regions == 1
+
+    def test_direct_cell_edit_falls_back_to_full_fill(self):
+        """Editing free cells directly forgets the region count, and the fill still works."""
+        arena = make_arena(10, 10, num_arena_enemies=0)
+        arena.set_cell(6, 5, CellState.WALL)
+        assert arena._free_regions is None
+        draw_vertical_line(arena, 3)
+        filled_cells = []
+        arena.fill_arena(lambda x, y: filled_cells.append((x, y)))
+        assert len(filled_cells) == 2 * 8
+        assert arena._free_regions == 1
+
+    def test_more_regions_than_fit_in_a_byte(self):
+        """Region labeling must not be limited by the byte-sized cell codes."""
+        arena = make_arena(5, 600, num_arena_enemies=0)
+        # Wall off every other interior row: 299 regions of 3 cells each
+        for y in range(2, 599, 2):
+            for x in range(1, 4):
+                arena.set_cell(x, y, CellState.WALL)
+        filled_cells = []
+        arena.fill_arena(lambda x, y: filled_cells.append((x, y)))
+        # The first (largest, ties broken by scan order) region is kept
+        assert len(filled_cells) == 298 * 3
+        assert arena.get_free_position() == (1, 1)
+
     def test_no_enemies_fills_smaller_region(self):
         """With no enemies, the smaller region should be filled."""
         arena = make_arena(20, 20, num_arena_enemies=0)
@@ -500,6 +616,100 @@ class TestFillArena:
         assert len(filled_cells) == 72
 
 
+# ---------------------------------------------------------------------------
+# Arena backends
+# ---------------------------------------------------------------------------
+
+class TestArenaBackends:
+    def test_create_arena_python(self):
+        arena = create_arena(make_config(), backend='python')
+        assert type(arena) is Arena
+
+    def test_create_arena_falls_back_without_numpy(self, monkeypatch):
+        monkeypatch.setattr(pystix, 'np', None)
+        assert type(create_arena(make_config(), backend='numpy')) is Arena
+        assert type(create_arena(make_config(), backend='auto')) is Arena
+
+    def test_create_arena_unknown_backend(self):
+        with pytest.raises(ValueError):
+            create_arena(make_config(), backend='gpu')
+
+
+class TestNumpyArena:
+    @pytest.fixture(autouse=True)
+    def require_numpy(self):
+        pytest.importorskip("numpy")
+
+    def make_pair(self, width, height, num_arena_enemies=0):
+        config = make_config(width=width, height=height, num_arena_enemies=num_arena_enemies)
+        return Arena(config), NumpyArena(config)
+
+    def test_grid_shares_cell_buffer(self):
+        arena = NumpyArena(make_config(width=12, height=8))
+        assert arena.grid.shape == (8, 12)
+        arena.set_cell(3, 2, CellState.FILLED)
+        assert arena.grid[2, 3] == CellState.FILLED
+        arena.grid[4, 5] = CellState.DRAWING
+        assert arena.get_cell(5, 4) == CellState.DRAWING
+
+    def test_fill_matches_python_backend(self):
+        for x in (3, 10, 15):
+            filled = []
+            for arena in self.make_pair(20, 20):
+                draw_vertical_line(arena, x)
+                cells = []
+                arena.fill_arena(lambda cx, cy: cells.append((cx, cy)))
+                filled.append((sorted(cells), bytes(arena.cells)))
+            assert filled[0] == filled[1]
+
+    def test_fill_spans_match_python_backend(self):
+        spans = []
+        for arena in self.make_pair(20, 20):
+            draw_vertical_line(arena, 6)
+            reported = []
+            arena.fill_arena_spans(lambda y, x_start, x_end: reported.append((y, x_start, x_end)))
+            spans.append(sorted(reported))
+        assert spans[0] == spans[1] == [(y, 1, 5) for y in range(1, 19)]
+
+    def test_fill_keeps_enemy_regions(self):
+        for arena in self.make_pair(20, 20, num_arena_enemies=2):
+            e0, e1 = arena.arena_enemies
+            e0.end1_x, e0.end1_y, e0.end2_x, e0.end2_y = 3, 10, 4, 10
+            e1.end1_x, e1.end1_y, e1.end2_x, e1.end2_y = 15, 10, 16, 10
+            draw_vertical_line(arena, 10)
+            assert arena.fill_arena(noop_fill_callback) is False
+            assert arena.get_cell(10, 5) == CellState.FREE
+
+    def test_many_regions(self):
+        arena = NumpyArena(make_config(width=5, height=600))
+        for y in range(2, 599, 2):
+            for x in range(1, 4):
+                arena.set_cell(x, y, CellState.WALL)
+        filled_cells = []
+        arena.fill_arena(lambda x, y: filled_cells.append((x, y)))
+        assert len(filled_cells) == 298 * 3
+        assert arena.get_free_position() == (1, 1)
+
+    def test_filled_count_tracks_fill(self):
+        arena = NumpyArena(make_config(width=20, height=20))
+        draw_vertical_line(arena, 5)
+        arena.fill_arena(noop_fill_callback)
+        assert arena._filled_count == arena._cells.count(CellState.WALL) + arena._cells.count(CellState.FILLED)
+
+    def test_statistics_and_perimeter_match(self):
+        python_arena, numpy_arena = self.make_pair(9, 7)
+        assert numpy_arena.filled_percent == pytest.approx(python_arena.filled_percent)
+        assert numpy_arena.get_free_position() == python_arena.get_free_position()
+        assert numpy_arena._perimeter_positions() == python_arena._perimeter_positions()
+
+    def test_get_free_position_none_when_full(self):
+        arena = NumpyArena(make_config(width=5, height=5))
+        for y in range(1, 4):
+            for x in range(1, 4):
+                arena.set_cell(x, y, CellState.FILLED)
+        assert arena.get_free_position() is None
+
+
 # ---------------------------------------------------------------------------
 # Drawing edge cases — the suspected bug area
 # ---------------------------------------------------------------------------
@@ -736,6 +946,80 @@ class TestLineEnemy:
         # Enemy should still be at (5,0)
         assert enemy.x == 5 and enemy.y == 0
 
+    def test_walk_mask_matches_can_move(self):
+        """The incremental walk mask agrees with can_move after drawing and filling."""
+        arena = make_arena(12, 12, num_line_enemies=1)
+        enemy = arena.line_enemies[0]
+        draw_vertical_line(arena, 5)
+        arena.fill_arena(noop_fill_callback)
+        player = arena.player
+        player.try_move(1, 0)
+        player.initiate_drawing()
+        player.try_move(0, -1)
+        player.try_move(0, -1)
+        assert arena.get_cell(6, 9) == CellState.DRAWING
+        arena.set_cell(0, 6, CellState.FILLED)
+        for y in range(12):
+            for x in range(12):
+                enemy.x, enemy.y = x, y
+                expected = sum(1 << d for d, (dx, dy) in enumerate(((1, 0), (-1, 0), (0, 1), (0, -1)))
+                               if enemy.can_move(dx, dy))
+                assert arena._walk_mask[y * 12 + x] == expected, (x, y)
+
+    def test_enemies_are_views_on_the_arena_swarm(self):
+        arena = make_arena(20, 20, num_line_enemies=3)
+        enemy = arena.line_enemies[1]
+        assert enemy.swarm is arena.line_swarm
+        assert len(arena.line_swarm) == 3
+        enemy.x, enemy.y = 7, 0
+        assert (arena.line_swarm.x[enemy.index], arena.line_swarm.y[enemy.index]) == (7, 0)
+
+    def test_swarm_step_matches_moving_one_by_one(self):
+        """Stepping the whole swarm moves every enemy as individual moves would."""
+        positions = []
+        for batched in (False, True):
+            random.seed(11)
+            arena = make_arena(30, 30, num_line_enemies=6)
+            draw_vertical_line(arena, 12)
+            arena.fill_arena(noop_fill_callback)
+            for _ in range(100):
+                if batched:
+                    arena.line_swarm.step()
+                else:
+                    for enemy in arena.line_enemies:
+                        enemy.move()
+            positions.append([(enemy.x, enemy.y, enemy.direction) for enemy in arena.line_enemies])
+        assert positions[0] == positions[1]
+
+    def test_wall_index_tracks_wall_cells(self):
+        """The wall index follows completed paths and direct cell edits."""
+        arena = make_arena(10, 10, num_line_enemies=1)
+        draw_vertical_line(arena, 4)
+        arena.fill_arena(noop_fill_callback)
+        arena.set_cell(9, 5, CellState.FILLED)
+        walls = {(x, y) for y in range(10) for x in range(10)
+                 if arena.get_cell(x, y) == CellState.WALL}
+        assert (4, 5) in arena._walls
+        assert (9, 5) not in arena._walls
+        assert sorted(arena._walls) == sorted(walls)
+        assert len(arena._walls) == len(walls)
+
+    def test_respawn_uses_interior_walls(self):
+        """Stranded enemies can respawn on walls left by earlier paths."""
+        random.seed(3)
+        arena = make_arena(10, 10, num_line_enemies=1)
+        draw_vertical_line(arena, 4)
+        arena.fill_arena(noop_fill_callback)
+        interior = {(4, y) for y in range(1, 9)}
+        enemy = arena.line_enemies[0]
+        landed = set()
+        for _ in range(200):
+            enemy.x, enemy.y = 6, 5
+            arena.change_player_path_state_to(CellState.FREE)
+            assert arena.get_cell(enemy.x, enemy.y) == CellState.WALL
+            landed.add((enemy.x, enemy.y))
+        assert landed & interior
+
 
 # ---------------------------------------------------------------------------
 # ArenaEnemy
@@ -760,6 +1044,88 @@ class TestArenaEnemy:
         assert result is True
         assert enemy.intersected is True
 
+    def test_drawing_runs_merge_straight_stretches(self):
+        """The path is indexed as one run per straight stretch, and emptied on revert."""
+        arena = make_arena(20, 20, num_arena_enemies=1)
+        player = arena.player
+        for _ in range(4):
+            player.try_move(1, 0)
+        player.initiate_drawing()
+        for _ in range(6):
+            player.try_move(0, 1)
+        for _ in range(5):
+            player.try_move(1, 0)
+        assert sorted(arena._drawing_runs.runs.values()) == [[4, 1, 4, 6], [5, 6, 9, 6]]
+        arena.change_player_path_state_to(CellState.FREE)
+        assert len(arena._drawing_runs) == 0
+
+    def test_stick_touches_path(self):
+        arena = make_arena(20, 20, num_arena_enemies=1)
+        for y in range(1, 19):
+            arena.set_cell(8, y, CellState.DRAWING)
+        assert arena.stick_touches_path(5, 5, 11, 7) is True
+        assert arena.stick_touches_path(2, 2, 6, 15) is False
+        # (7, 3)-(9, 1) passes diagonally over the corner of (8, 2) without covering it
+        arena.set_cell(8, 2, CellState.FREE)
+        arena.set_cell(8, 1, CellState.FREE)
+        arena.set_cell(8, 3, CellState.FREE)
+        assert arena.stick_touches_path(7, 3, 9, 1) is False
+        assert arena.stick_touches_path(7, 4, 9, 4) is True
+
+    def test_move_detects_path_drawn_across_resting_stick(self):
+        """A stick that cannot move still notices a path drawn across it."""
+        arena = make_arena(20, 20, num_arena_enemies=1)
+        enemy = arena.arena_enemies[0]
+        enemy.end1_x, enemy.end1_y, enemy.end2_x, enemy.end2_y = 5, 5, 12, 5
+        enemy.vel1_x = enemy.vel1_y = enemy.vel2_x = enemy.vel2_y = 1
+        enemy.count1 = enemy.count2 = 50
+        for y in range(1, 19):
+            arena.set_cell(8, y, CellState.DRAWING)
+        # Walls in the way of every endpoint move, so no candidate stick is tested
+        for x, y in ((6, 5), (5, 6), (13, 5), (12, 6)):
+            arena.set_cell(x, y, CellState.WALL)
+        _, _, intersected = enemy.move()
+        assert (enemy.end1_x, enemy.end1_y, enemy.end2_x, enemy.end2_y) == (5, 5, 12, 5)
+        assert intersected is True
+
+    def test_swarm_step_matches_moving_one_by_one(self):
+        """Stepping the whole swarm moves every stick as individual moves would,
+        including sticks that run into walls and the player's drawing."""
+        states = []
+        for batched in (False, True):
+            random.seed(5)
+            arena = make_arena(24, 24, num_arena_enemies=5)
+            for y in range(3, 21):
+                arena.set_cell(15, y, CellState.DRAWING)
+            hits = []
+            for _ in range(150):
+                if batched:
+                    arena.arena_swarm.step()
+                    hits.append(list(arena.arena_swarm.intersected))
+                else:
+                    hits.append([enemy.move()[2] for enemy in arena.arena_enemies])
+            states.append((hits, [(e.end1_x, e.end1_y, e.end2_x, e.end2_y, e.count1, e.count2)
+                                  for e in arena.arena_enemies]))
+        assert states[0] == states[1]
+        assert any(any(frame) for frame in states[0][0])
+
+    def test_intersects_walks_bresenham_cells(self):
+        """A stick covers exactly the cells of the Bresenham line between its endpoints."""
+        arena = make_arena(20, 20, num_arena_enemies=1)
+        enemy = arena.arena_enemies[0]
+        lines = {
+            (3, 2, 5, 8): [(3, 2), (3, 3), (4, 4), (4, 5), (4, 6), (5, 7), (5, 8)],
+            (12, 9, 4, 6): [(12, 9), (11, 9), (10, 8), (9, 8), (8, 7), (7, 7), (6, 7), (5, 6), (4, 6)],
+        }
+        for (x1, y1, x2, y2), line in lines.items():
+            for y in range(1, 19):
+                for x in range(1, 19):
+                    arena.set_cell(x, y, CellState.DRAWING)
+                    enemy.intersected = False
+                    assert enemy.intersects(x1, y1, x2, y2) == ((x, y) in line), (x, y)
+                    assert enemy.intersected == ((x, y) in line)
+                    arena.set_cell(x, y, CellState.FREE)
+
 
 # ---------------------------------------------------------------------------
 # filled_percent
@@ -788,6 +1154,34 @@ class TestFilledPercent:
         arena.set_cell(2, 2, CellState.FILLED)
         assert arena.filled_percent == pytest.approx(17 / 25)
 
+    def test_overwriting_counted_cell_keeps_count(self):
+        arena = make_arena(5, 5)
+        arena.set_cell(2, 2, CellState.FILLED)
+        arena.set_cell(2, 2, CellState.WALL)
+        assert arena.filled_percent == pytest.approx(17 / 25)
+        arena.set_cell(0, 0, CellState.FREE)
+        assert arena.filled_percent == pytest.approx(16 / 25)
+
+    def test_running_count_matches_cells(self):
+        """The incrementally maintained count must agree with a full scan after
+        fills, wasted draws and deaths."""
+        def scanned(arena):
+            cells = bytes(arena.cells)
+            return (cells.count(CellState.WALL) + cells.count(CellState.FILLED)) / len(cells)
+
+        arena = make_arena(20, 20, num_arena_enemies=0)
+        draw_vertical_line(arena, 5)
+        arena.fill_arena(noop_fill_callback)
+        assert arena.filled_percent == pytest.approx(scanned(arena))
+
+        player = arena.player
+        player.try_move(1, 0)
+        player.initiate_drawing()
+        player.try_move(0, -1)
+        player.try_move(0, -1)
+        arena.change_player_path_state_to(CellState.FREE)  # death reverts the path
+        assert arena.filled_percent == pytest.approx(scanned(arena))
+
 
 # ---------------------------------------------------------------------------
 # L-shaped and corner drawings
@@ -915,6 +1309,15 @@ class TestPath:
         path.add_position(3, 4)
         assert path.get_positions() == [(1, 2), (3, 4)]
 
+    def test_length_and_indexing(self):
+        path = Path()
+        for y in range(1, 5):
+            path.add_position(2, y)
+        assert len(path) == 4
+        assert path[0] == (2, 1)
+        assert path[-1] == (2, 4)
+        assert list(path) == path.get_positions()
+
 
 # ---------------------------------------------------------------------------
 # Game._move simulation (without pygame)
@@ -927,6 +1330,7 @@ class FakeCanvas:
     def create_new_drawing_surface(self): pass
     def create_line_arena(self, *a): pass
     def create_arena_rect(self, *a): pass
+    def create_arena_span(self, *a): pass
     def create_dot_arena(self, *a, **kw): pass
     def complete_drawing(self): pass
     def arena_to_pixel(self, ax, ay): return (ax, ay)
@@ -1538,6 +1942,14 @@ class TestLevelGenerator:
         assert config.fuse_speed >= 1
         assert config.fuse_chance > 0
 
+    def test_swarm_size_adds_enemies(self):
+        random.seed(2)
+        base = LevelGenerator().build_level(5)
+        random.seed(2)
+        swarm = LevelGenerator(swarm_size=100).build_level(5)
+        assert swarm.num_line_enemies == base.num_line_enemies + 100
+        assert swarm.num_arena_enemies == base.num_arena_enemies + 100
+
     def test_arena_size_reasonable(self):
         """Arena should be between 50 and 200 for any level."""
         gen = LevelGenerator()
@@ -1619,3 +2031,720 @@ class TestLevelGenerator:
             config = gen.build_level(level)
             assert config.num_line_enemies <= 5
             assert config.num_arena_enemies <= 4
+
+    def test_level_config_is_frozen_and_hashable(self):
+        """Level configs are immutable values that can key a cache."""
+        config = make_config(width=30, height=20)
+        assert hash(config) == hash(make_config(width=30, height=20))
+        assert {config: 1}[make_config(width=30, height=20)] == 1
+        with pytest.raises(dataclasses.FrozenInstanceError):
+            config.arena_width = 40
+
+
+# ---------------------------------------------------------------------------
+# Slotted entities
+# ---------------------------------------------------------------------------
+
+class TestSlots:
+    def test_entities_have_no_instance_dict(self):
+        arena = make_arena(20, 20, num_line_enemies=1, num_arena_enemies=1)
+        entities = [arena.player, arena.player.path, arena.line_enemies[0],
+                    arena.arena_enemies[0], FuseEnemy(arena.player.path, 0, 0),
+                    make_config(), pystix.GameConfig()]
+        for entity in entities:
+            assert not hasattr(entity, '__dict__'), type(entity).__name__
+
+    def test_unknown_attributes_are_rejected(self):
+        arena = make_arena(20, 20)
+        with pytest.raises(AttributeError):
+            arena.player.speed = 2
+
+
+# ---------------------------------------------------------------------------
+# Headless simulation
+# ---------------------------------------------------------------------------
+
+def make_simulation(lives=3, **config_kwargs):
+    """Create a Simulation playing a fuse-free test level."""
+    sim = Simulation(GameConfig(starting_lives=lives, arena_backend='python'))
+    sim.start_new_game()
+    sim.start_level(dataclasses.replace(make_config(**config_kwargs), fuse_speed=0))
+    return sim
+
+
+def event_types(events):
+    return [event.type for event in events]
+
+
+class TestSimulation:
+    def test_runs_without_pygame(self, monkeypatch):
+        monkeypatch.setattr(pystix, 'pygame', None)
+        random.seed(3)
+        sim = Simulation(GameConfig())
+        sim.start_new_game()
+        actions = [Action.NONE, Action.UP, Action.DOWN, Action.LEFT, Action.RIGHT,
+                   Action.DRAW | Action.DOWN, Action.DRAW | Action.RIGHT]
+        for _ in range(2000):
+            sim.step(random.choice(actions))
+        assert sim.frame_count > 0
+        assert sim.state in (GameState.PLAYING, GameState.GAME_OVER, GameState.LEVEL_TRANSITION)
+
+    def test_drawing_emits_lines_then_fill(self):
+        sim = make_simulation()
+        for _ in range(3):
+            sim.step(Action.RIGHT)
+        sim.step(Action.DRAW)
+        events = sim.step(Action.DOWN)
+        assert events[0].type == EventType.LINE_DRAWN
+        assert events[0].data == (3, 0, 3, 1)
+        # The drawing direction carries the player down to the bottom wall
+        events = []
+        for _ in range(8):
+            events += sim.step()
+        assert event_types(events).count(EventType.LINE_DRAWN) == 8
+        filled = [event for event in events if event.type == EventType.ARENA_FILLED]
+        assert len(filled) == 1
+        spans, was_filled = filled[0].data
+        assert was_filled and spans
+        assert sim.score > 0
+        assert sim.drawing_direction is None
+
+    def test_death_respawns_after_death_frames(self):
+        sim = make_simulation()
+        for action in [Action.RIGHT] * 3 + [Action.DRAW, Action.DOWN]:
+            sim.step(action)
+        events = sim.step(Action.UP)  # back into the line being drawn
+        died = [event for event in events if event.type == EventType.PLAYER_DIED]
+        assert died and died[0].data[2] == 'drawing'
+        assert sim.lives == 2
+        for _ in range(Simulation.DEATH_FRAMES - 1):
+            assert EventType.PLAYER_RESPAWNED not in event_types(sim.step())
+        assert event_types(sim.step()) == [EventType.PLAYER_RESPAWNED]
+        assert (sim.arena.player.x, sim.arena.player.y) == (0, 0)
+        assert sim.invincibility_frames > 0
+
+    def test_last_death_ends_the_game(self):
+        sim = make_simulation(lives=1)
+        for action in [Action.RIGHT] * 3 + [Action.DRAW, Action.DOWN, Action.UP]:
+            sim.step(action)
+        events = []
+        for _ in range(Simulation.DEATH_FRAMES):
+            events += sim.step()
+        assert events[-1].type == EventType.GAME_OVER
+        assert sim.state == GameState.GAME_OVER
+        assert sim.step(Action.RIGHT) == []
+
+
+class TestFixedTimestep:
+    def test_ticks_follow_elapsed_time(self):
+        timestep = FixedTimestep(60)
+        assert timestep.advance(1 / 120) == 0  # rendering faster than the tick rate
+        assert timestep.advance(1 / 120) == 1
+        assert timestep.advance(3.5 / 60) == 3  # slow frame: catch up with several ticks
+        assert timestep.accumulator == pytest.approx(0.5 / 60)
+
+    def test_catch_up_is_capped(self):
+        timestep = FixedTimestep(60, max_ticks=5)
+        assert timestep.advance(1.0) == 5
+        assert timestep.accumulator == 0.0
+        assert timestep.advance(1 / 60 + 1e-9) == 1
+
+    def test_same_ticks_at_any_frame_rate(self):
+        """Simulated time depends only on elapsed time, not on how it was sliced into frames."""
+        for fps in (30, 60, 144, 500):
+            timestep = FixedTimestep(60)
+            ticks = sum(timestep.advance(1 / fps) for _ in range(fps * 2))
+            assert ticks in (119, 120)
+
+
+# ---------------------------------------------------------------------------
+# Seeded random streams
+# ---------------------------------------------------------------------------
+
+def play_recorded_game(seed, frames=1500, burn_effects=False):
+    """Play a seeded game on fixed pseudo-random input; returns its events, final cells
+    and enemy positions."""
+    sim = Simulation(GameConfig(seed=seed, arena_backend='python'))
+    sim.start_new_game()
+    inputs = random.Random(99)
+    actions = [Action.UP, Action.DOWN, Action.LEFT, Action.RIGHT, Action.DRAW | Action.DOWN]
+    events = []
+    for _ in range(frames):
+        if burn_effects:
+            sim.streams.effects.random()  # what a renderer's explosions would consume
+        events += sim.step(inputs.choice(actions))
+    arena = sim.arena
+    return (events, bytes(arena.cells), arena.line_swarm.x, arena.line_swarm.y,
+            arena.arena_swarm.end1_x, arena.arena_swarm.end2_y)
+
+
+class TestRandomStreams:
+    def test_same_seed_same_streams(self):
+        a, b = RandomStreams(7), RandomStreams(7)
+        for name in ('level', 'enemies', 'fuse', 'effects'):
+            assert getattr(a, name).random() == getattr(b, name).random()
+        assert a.enemies.random() != RandomStreams(8).enemies.random()
+
+    def test_streams_are_independent(self):
+        streams = RandomStreams(7)
+        assert streams.level.random() != streams.enemies.random()
+
+    @pytest.mark.parametrize("seed", [-1, 1 << 64])
+    def test_rejects_seeds_replays_cannot_store(self, seed):
+        with pytest.raises(ValueError):
+            RandomStreams(seed)
+        with pytest.raises(ValueError):
+            Simulation(GameConfig(seed=seed))
+        with pytest.raises(SystemExit):
+            pystix.main(['--seed', str(seed)])
+
+    def test_largest_seed_round_trips_in_replays(self):
+        sim = Simulation(GameConfig(seed=RandomStreams.MAX_SEED))
+        sim.start_new_game()
+        replay = Replay(sim.streams.seed, sim.game_config)
+        assert Replay.from_bytes(replay.to_bytes()).seed == RandomStreams.MAX_SEED
+
+    def test_seeded_game_is_reproducible(self):
+        assert play_recorded_game(42) == play_recorded_game(42)
+        assert play_recorded_game(42) != play_recorded_game(43)
+
+    def test_effects_do_not_perturb_gameplay(self):
+        assert play_recorded_game(42) == play_recorded_game(42, burn_effects=True)
+
+    def test_arena_uses_given_stream(self):
+        config = make_config(width=30, height=20, num_line_enemies=3, num_arena_enemies=2)
+        first = Arena(config, random.Random(5))
+        second = Arena(config, random.Random(5))
+        random.random()  # the global stream is not involved
+        for _ in range(50):
+            first.line_swarm.step()
+            first.arena_swarm.step()
+            second.line_swarm.step()
+            second.arena_swarm.step()
+        assert first.line_swarm.x == second.line_swarm.x
+        assert first.arena_swarm.end1_x == second.arena_swarm.end1_x
+
+
+# ---------------------------------------------------------------------------
+# Replays
+# ---------------------------------------------------------------------------
+
+def record_game(seed, frames=3000):
+    """Play a seeded game on pseudo-random input the way Game does, recording each tick."""
+    game_config = GameConfig(seed=seed, starting_lives=2)
+    sim = Simulation(game_config)
+    sim.start_new_game()
+    replay = Replay(sim.streams.seed, game_config)
+    inputs = random.Random(seed)
+    actions = [Action.UP, Action.DOWN, Action.LEFT, Action.RIGHT, Action.DRAW | Action.DOWN,
+               Action.DRAW | Action.RIGHT, Action.NONE]
+    action, hold = Action.NONE, 0
+    for _ in range(frames):
+        if sim.state == GameState.LEVEL_TRANSITION:
+            sim.advance_to_next_level()
+        elif sim.state != GameState.PLAYING:
+            break
+        if hold == 0:  # hold each input for a while, like a player would
+            action, hold = inputs.choice(actions), inputs.randint(1, 20)
+        hold -= 1
+        replay.record(action)
+        sim.step(action)
+    return sim, replay
+
+
+class TestReplay:
+    def test_bytes_round_trip(self):
+        replay = Replay(1234, GameConfig(starting_lives=5, swarm_size=7), [Action.UP, Action.DRAW | Action.LEFT])
+        loaded = Replay.from_bytes(replay.to_bytes())
+        assert loaded.seed == 1234
+        assert loaded.actions == bytes([Action.UP, Action.DRAW | Action.LEFT])
+        config = loaded.game_config()
+        assert (config.starting_lives, config.swarm_size, config.seed) == (5, 7, 1234)
+
+    def test_held_keys_compress(self):
+        replay = Replay(1, GameConfig(), [Action.RIGHT] * 10000)
+        assert len(replay.to_bytes()) < 200
+
+    def test_rejects_other_files(self):
+        with pytest.raises(ValueError):
+            Replay.from_bytes(b'PK\x03\x04' + bytes(40))
+        with pytest.raises(ValueError):
+            Replay.from_bytes(b'PSRP')
+
+    def test_replay_reproduces_recorded_game(self, tmp_path):
+        sim, replay = record_game(seed=10)
+        assert sim.score > 0 and sim.state == GameState.GAME_OVER
+        path = tmp_path / 'game.replay'
+        replay.save(path)
+        result = run_replay(Replay.load(path), arena_backend='python')
+        assert result.score == sim.score
+        assert result.level == sim.current_level
+        assert result.state == sim.state
+        assert sum(result.level_frames) == len(replay)
+
+    @pytest.mark.parametrize("seed", [7, 10])
+    def test_same_seed_plays_the_same_game_on_both_backends(self, seed):
+        pytest.importorskip("numpy")
+        _, replay = record_game(seed=seed, frames=6000)
+        games = []
+        for backend in ('python', 'numpy'):
+            game_config = replay.game_config()
+            game_config.arena_backend = backend
+            sim = Simulation(game_config)
+            sim.start_new_game(replay.seed)
+            states = []
+            for tick, actions in enumerate(replay.actions):
+                if sim.state == GameState.LEVEL_TRANSITION:
+                    sim.advance_to_next_level()
+                sim.step(actions)
+                if tick % 500 == 0:
+                    states.append(game_state(sim))
+            games.append(states + [game_state(sim)])
+        assert games[0] == games[1]
+
+    def test_main_reports_replay(self, tmp_path, capsys):
+        _, replay = record_game(seed=6, frames=500)
+        path = tmp_path / 'game.replay'
+        replay.save(path)
+        pystix.main(['--replay', str(path)])
+        out = capsys.readouterr().out
+        assert f"Replayed {len(replay)} ticks" in out
+        assert "Level 1:" in out
+
+
+# ---------------------------------------------------------------------------
+# Batch simulation
+# ---------------------------------------------------------------------------
+
+class TestBatchSimulation:
+    def test_simulated_game_is_deterministic(self):
+        levels = simulate_game(3, bot='random', max_ticks=3000)
+        assert levels == simulate_game(3, bot='random', max_ticks=3000)
+        for level, archetype, frames, deaths, completed in levels:
+            assert archetype in ARCHETYPES
+            assert frames > 0 and deaths >= 0
+
+    def test_tick_limit_ends_game(self):
+        levels = simulate_game(0, bot='sweep', max_ticks=100)
+        assert levels == [(1, 'open', 100, 0, False)]
+
+    def test_sweep_bot_completes_levels(self):
+        completed = [level for seed in (3, 4)
+                     for level in simulate_game(seed, bot='sweep', max_ticks=5000) if level[4]]
+        assert completed
+
+    def test_batch_aggregates_per_archetype(self):
+        report = run_batch(3, bot='random', processes=2, max_ticks=2000)
+        games = [simulate_game(seed, bot='random', max_ticks=2000) for seed in range(3)]
+        levels = [level for game in games for level in game]
+        assert sum(stats['played'] for stats in report.values()) == len(levels)
+        assert sum(stats['deaths'] for stats in report.values()) == sum(level[3] for level in levels)
+        for stats in report.values():
+            assert 0.0 <= stats['completion_rate'] <= 1.0
+
+
+# ---------------------------------------------------------------------------
+# Vectorized environments
+# ---------------------------------------------------------------------------
+
+class TestVectorEnv:
+    def make_env(self, num_envs=3, **config_kwargs):
+        config = dataclasses.replace(make_config(width=20, height=12, **config_kwargs), fuse_speed=0)
+        return VectorEnv(num_envs, config, GameConfig(starting_lives=1, arena_backend='python'))
+
+    def test_observations_without_numpy(self, monkeypatch):
+        monkeypatch.setattr(pystix, 'np', None)
+        env = self.make_env()
+        obs = env.reset()
+        assert isinstance(obs, memoryview)
+        assert obs.shape == (3, 12, 20)
+        assert obs[1, 0, 5] == CellState.WALL and obs[1, 5, 5] == CellState.FREE
+
+    @pytest.mark.parametrize("count", [2, 4])
+    def test_rejects_wrong_number_of_actions(self, count):
+        env = self.make_env()
+        env.reset()
+        with pytest.raises(ValueError):
+            env.step([Action.RIGHT] * count)
+        assert all(sim.frame_count == 0 for sim in env.simulations)
+
+    def test_observations_track_each_arena(self):
+        np = pytest.importorskip("numpy")
+        env = self.make_env()
+        obs = env.reset()
+        assert obs.dtype == np.uint8 and obs.shape == (3, 12, 20)
+        for _ in range(3):
+            env.step([Action.RIGHT, Action.NONE, Action.NONE])
+        env.step(np.array([Action.DRAW, Action.NONE, Action.NONE]))
+        obs, rewards, dones = env.step(np.array([Action.DOWN, Action.NONE, Action.NONE]))
+        assert obs[0, 1, 3] == CellState.DRAWING
+        assert (obs[1] == obs[2]).all()
+        for i, sim in enumerate(env.simulations):
+            assert bytes(obs[i]) == bytes(sim.arena.cells)
+        assert rewards == [0, 0, 0] and dones == [False, False, False]
+
+    def test_done_environment_is_reset(self):
+        env = self.make_env(num_envs=2)
+        env.reset()
+        for action in [Action.RIGHT] * 3 + [Action.DRAW, Action.DOWN]:
+            env.step([action, Action.NONE])
+        env.step([Action.UP, Action.NONE])  # runs into its own line: last life lost
+        dones = []
+        for _ in range(Simulation.DEATH_FRAMES):
+            _, rewards, dones = env.step([Action.NONE, Action.NONE])
+        assert dones == [True, False]
+        assert env.simulations[0].state == GameState.PLAYING
+        assert env.simulations[0].streams.seed == 2  # seeds 0 and 1 went to the first episodes
+        assert CellState.DRAWING not in bytes(env.observations[0])
+
+    def test_completing_the_level_rewards_and_resets(self):
+        env = self.make_env(num_envs=1, fill_percent=0.3)
+        env.reset()
+        for _ in range(4):
+            env.step([Action.RIGHT])
+        env.step([Action.DRAW])
+        total = 0
+        for _ in range(11):  # down to the bottom wall
+            _, rewards, dones = env.step([Action.DOWN])
+            total += rewards[0]
+        assert dones == [True]
+        assert total > 0
+        assert env.simulations[0].arena.filled_percent < 0.3  # a fresh arena
+
+
+# ---------------------------------------------------------------------------
+# Snapshots and seeking
+# ---------------------------------------------------------------------------
+
+def game_state(sim):
+    """Everything a snapshot must reproduce, in comparable form."""
+    arena = sim.arena
+    fuse = sim.fuse and (sim.fuse.x, sim.fuse.y, sim.fuse.path_index, sim.fuse.active)
+    return (sim.state, sim.current_level, sim.lives, sim.score, sim.frame_count,
+            sim.drawing_direction, sim.death_frames, sim.invincibility_frames, sim.config,
+            bytes(arena.cells), list(arena._walls), arena.player.path.get_positions(),
+            (arena.player.x, arena.player.y, arena.player.is_drawing),
+            arena.line_swarm.x, arena.line_swarm.y, arena.line_swarm.direction,
+            [getattr(arena.arena_swarm, f) for f in pystix.ArenaEnemySwarm.__slots__[1:]],
+            fuse, sim.streams.enemies.getstate(), sim.streams.fuse.getstate())
+
+
+class TestSnapshot:
+    def test_restore_reproduces_state_and_future(self):
+        sim, replay = record_game(seed=10, frames=250)
+        snapshot = sim.snapshot()
+        restored = Simulation(sim.game_config)
+        restored.restore(snapshot)
+        assert game_state(restored) == game_state(sim)
+        for action in [Action.RIGHT] * 5 + [Action.DRAW | Action.DOWN] * 40:
+            assert restored.step(action) == sim.step(action)
+        assert game_state(restored) == game_state(sim)
+
+    def test_seed_range_fits_the_snapshot(self):
+        sim = make_simulation()
+        with pytest.raises(ValueError):
+            sim.start_new_game(seed=-1)
+        sim.start_new_game(seed=RandomStreams.MAX_SEED)
+        restored = Simulation(sim.game_config)
+        restored.restore(sim.snapshot())
+        assert restored.streams.seed == RandomStreams.MAX_SEED
+        assert game_state(restored) == game_state(sim)
+
+    def test_restore_mid_drawing_with_fuse(self):
+        sim = make_simulation(width=30, height=20, num_line_enemies=2, num_arena_enemies=2)
+        sim.config = dataclasses.replace(sim.config, fuse_speed=1, fuse_chance=1.0, fuse_delay=3)
+        for action in [Action.RIGHT] * 5 + [Action.DRAW, Action.DOWN, Action.NONE, Action.NONE]:
+            sim.step(action)
+        assert sim.fuse is not None and sim.arena.player.is_drawing
+        restored = Simulation(sim.game_config)
+        restored.restore(sim.snapshot())
+        assert game_state(restored) == game_state(sim)
+        assert restored.fuse.path is restored.arena.player.path
+        assert restored.arena.stick_touches_path(5, 0, 5, 10)
+        for _ in range(20):
+            assert restored.step() == sim.step()
+
+    def test_rejects_other_data(self):
+        with pytest.raises(ValueError):
+            make_simulation().restore(b'PSRP\x01' + bytes(10))
+
+
+class TestReplayCursor:
+    def test_seek_back_matches_playing_forward(self):
+        _, replay = record_game(seed=10)
+        cursor = ReplayCursor(replay, keyframe_interval=100, arena_backend='python')
+        cursor.seek(len(replay))
+        assert sorted(cursor.keyframes) == list(range(0, len(replay) + 1, 100))
+        fresh = ReplayCursor(replay, keyframe_interval=100, arena_backend='python')
+        for tick in (321, 57, 400, len(replay)):
+            expected = game_state(fresh.seek(tick))
+            assert game_state(cursor.seek(tick)) == expected
+
+    def test_seek_replays_from_nearest_keyframe(self, monkeypatch):
+        _, replay = record_game(seed=10)
+        cursor = ReplayCursor(replay, keyframe_interval=100, arena_backend='python')
+        cursor.seek(len(replay))
+        steps = []
+        original_step = ReplayCursor.step
+        monkeypatch.setattr(ReplayCursor, 'step', lambda self: steps.append(1) or original_step(self))
+        cursor.seek(250)
+        assert len(steps) == 50
+
+    def test_seek_outside_recording(self):
+        _, replay = record_game(seed=10, frames=50)
+        with pytest.raises(IndexError):
+            ReplayCursor(replay).seek(51)
+
+
+# ---------------------------------------------------------------------------
+# Save files
+# ---------------------------------------------------------------------------
+
+class TestSaveFiles:
+    def test_cell_runs_round_trip(self):
+        arena = make_arena(200, 200)
+        draw_vertical_line(arena, 60)
+        arena.fill_arena(noop_fill_callback)
+        codes, lengths = pystix._rle_encode(arena._cells)
+        assert pystix._rle_decode(codes, lengths) == bytes(arena._cells)
+        assert len(codes) < 4 * 200  # a few runs per row, not 40000 cells
+        assert len(zlib.compress(codes + lengths.tobytes())) < 400
+
+    def test_large_arena_snapshot_is_compact(self):
+        sim = make_simulation(width=200, height=200)
+        for action in [Action.RIGHT] * 60 + [Action.DRAW] + [Action.DOWN] * 200:
+            sim.step(action)
+        assert sim.arena.filled_percent > 0.3
+        snapshot = sim.snapshot()
+        # Dominated by the random streams' state (4 x 2.5 KB); the grid adds little
+        assert len(snapshot) < 11000
+        restored = Simulation(sim.game_config)
+        restored.restore(snapshot)
+        assert game_state(restored) == game_state(sim)
+
+    def test_background_writer_replaces_atomically(self, tmp_path):
+        path = tmp_path / 'save.bin'
+        writer = BackgroundWriter()
+        writer.write(str(path), b'first')
+        writer.write(str(path), b'second')
+        writer.flush()
+        assert path.read_bytes() == b'second'
+        assert [p.name for p in tmp_path.iterdir()] == ['save.bin']  # no temporary files left
+        writer.remove(str(path))
+        writer.flush()
+        assert not path.exists()
+
+    def test_failed_write_keeps_old_file(self, tmp_path, monkeypatch):
+        path = tmp_path / 'save.bin'
+        path.write_bytes(b'old')
+        monkeypatch.setattr(pystix.os, 'replace', lambda src, dst: (_ for _ in ()).throw(OSError("disk full")))
+        writer = BackgroundWriter()
+        writer.write(str(path), b'new')
+        writer.flush()
+        assert path.read_bytes() == b'old'
+        assert [p.name for p in tmp_path.iterdir()] == ['save.bin']
+
+    def test_resume_from_saved_file(self, tmp_path):
+        sim, _ = record_game(seed=10, frames=300)
+        path = tmp_path / 'save.bin'
+        writer = BackgroundWriter()
+        writer.write(str(path), sim.snapshot())
+        writer.flush()
+        resumed = Simulation(sim.game_config)
+        resumed.restore(path.read_bytes())
+        assert game_state(resumed) == game_state(sim)
+
+    def test_game_resumes_and_plays_on(self, tmp_path, monkeypatch):
+        pygame = pytest.importorskip("pygame")
+        monkeypatch.setenv("SDL_VIDEODRIVER", "dummy")
+        config = GameConfig(seed=10, save_file=str(tmp_path / 'save.bin'), replay_file='',
+                            high_score_file=str(tmp_path / 'high_score.json'))
+        try:
+            game = pystix.Game(pystix.PyGameCanvas(config), config)
+            game._start_new_game()
+            for _ in range(30):
+                game._loop_playing(1)
+            game._save_game()
+            game.saver.flush()
+            saved = game_state(game.simulation)
+
+            resumed = pystix.Game(game.canvas, config)
+            assert resumed._can_resume()
+            resumed._resume_game()
+            assert resumed.state == GameState.PLAYING and resumed.recording is None
+            assert game_state(resumed.simulation) == saved
+            for _ in range(30):
+                resumed._loop_playing(1)
+            assert resumed.simulation.frame_count == saved[4] + 30
+        finally:
+            pygame.quit()
+
+
+# ---------------------------------------------------------------------------
+# Level pipeline
+# ---------------------------------------------------------------------------
+
+def complete_level(sim):
+    """Draw one line across a low-target test level so that it completes."""
+    for action in [Action.RIGHT] * 4 + [Action.DRAW] + [Action.DOWN] * (sim.config.arena_height - 1):
+        sim.step(action)
+    assert sim.state == GameState.LEVEL_TRANSITION
+
+
+class TestLevelPipeline:
+    def test_level_stream_is_lazy_and_matches_the_game(self):
+        generator = LevelGenerator()
+        levels = generator.levels(start=3)
+        assert generator.last_archetypes == []
+        assert next(levels).level_number == 3 and len(generator.last_archetypes) == 1
+
+        stream = LevelGenerator.stream(17)
+        first = next(stream)
+        sim = Simulation(GameConfig(seed=17))
+        sim.start_new_game()
+        assert sim.config == first
+        generator = LevelGenerator(rng=RandomStreams(17).level)
+        assert [next(stream) for _ in range(5)] == [generator.build_level(n) for n in range(1, 7)][1:]
+
+    def test_prepared_level_plays_like_one_built_on_start(self):
+        games = []
+        for prepare in (False, True):
+            sim = make_simulation(width=20, height=12, fill_percent=0.3)
+            sim.start_new_game(seed=8, config=sim.config)
+            complete_level(sim)
+            snapshot = sim.snapshot()
+            if prepare:
+                arena = sim.prepare_next_level()
+                assert sim.snapshot() == snapshot  # building ahead leaves the game state alone
+            sim.advance_to_next_level()
+            if prepare:
+                assert sim.arena is arena and arena.rng is sim.streams.enemies
+            events = [sim.step(action) for action in [Action.RIGHT, Action.DRAW, Action.DOWN] * 30]
+            games.append((game_state(sim), events))
+        assert games[0] == games[1]
+
+    def test_prepared_arena_for_another_config_is_ignored(self):
+        sim = make_simulation(width=20, height=12, fill_percent=0.3)
+        complete_level(sim)
+        stale = sim.prepare_next_level()
+        sim.next_level_config = dataclasses.replace(sim.next_level_config, arena_width=30)
+        sim.advance_to_next_level()
+        assert sim.arena is not stale and sim.arena.arena_width == 30
+
+
+# ---------------------------------------------------------------------------
+# Per-size caches
+# ---------------------------------------------------------------------------
+
+class TestArenaTemplates:
+    @pytest.mark.parametrize("backend", ["python", "numpy"])
+    def test_arenas_from_a_cached_template_share_no_state(self, backend):
+        config = make_config(width=13, height=9)
+        first = create_arena(config, backend=backend)
+        first.set_cell(3, 3, CellState.FILLED)
+        first.set_cell(1, 0, CellState.FILLED)
+        first.set_cell(5, 5, CellState.WALL)
+        second = create_arena(config, backend=backend)
+        assert (type(second), 13, 9) in Arena._templates._entries
+        assert second.get_cell(3, 3) == CellState.FREE
+        assert second.get_cell(1, 0) == CellState.WALL
+        assert second.get_cell(5, 5) == CellState.FREE
+        assert second._walk_mask != first._walk_mask
+        assert sorted(second._walls) == sorted(second._perimeter_positions())
+        assert second.filled_percent == pytest.approx(len(second._walls) / (13 * 9))
+
+    def test_lru_cache_evicts_least_recently_used(self):
+        cache = pystix._LRUCache(2)
+        built = []
+        def build(key):
+            return lambda: built.append(key) or key
+        cache.get("a", build("a"))
+        cache.get("b", build("b"))
+        cache.get("a", build("a"))
+        cache.get("c", build("c"))
+        cache.get("a", build("a"))
+        cache.get("b", build("b"))
+        assert built == ["a", "b", "c", "b"]
+        assert len(cache) == 2
+
+    def test_position_set_copy_is_independent(self):
+        walls = pystix._PositionSet([(0, 0), (1, 0)])
+        copy = walls.copy()
+        copy.discard((0, 0))
+        copy.add((5, 5))
+        assert list(walls) == [(0, 0), (1, 0)]
+        assert (0, 0) not in copy and (5, 5) in copy
+
+
+# ---------------------------------------------------------------------------
+# Dirty-rect rendering (needs pygame; runs on its dummy video driver)
+# ---------------------------------------------------------------------------
+
+class TestDirtyRects:
+    @pytest.fixture
+    def canvas(self, monkeypatch):
+        pygame = pytest.importorskip("pygame")
+        monkeypatch.setenv("SDL_VIDEODRIVER", "dummy")
+        canvas = pystix.PyGameCanvas(GameConfig())
+        canvas.configure(40, 30)
+        updates = []
+        monkeypatch.setattr(pygame.display, "update", lambda rects: updates.append(rects))
+        monkeypatch.setattr(pygame.display, "flip", lambda: updates.append(None))
+        canvas.updates = updates
+        yield canvas
+        pygame.quit()
+
+    def composite(self, canvas):
+        pygame = pystix.pygame
+        expected = canvas.arena_surface.copy()
+        expected.blit(canvas.drawing_surface, (0, 0), special_flags=pygame.BLEND_ADD)
+        return pygame.image.tobytes(expected, "RGB")
+
+    def test_merge_rects_joins_overlapping_rects_only(self):
+        pygame = pytest.importorskip("pygame")
+        merged = pystix._merge_rects([(0, 0, 10, 10), (50, 50, 5, 5), (5, 5, 10, 10), (14, 14, 40, 2)])
+        assert sorted(map(tuple, merged)) == [(0, 0, 54, 16), (50, 50, 5, 5)]
+        assert pystix._merge_rects([]) == [] and isinstance(merged[0], pygame.Rect)
+
+    def test_only_changed_areas_are_redrawn_after_the_first_frame(self, canvas):
+        pygame = pystix.pygame
+        screen_area = canvas.width * canvas.height
+        canvas.render_arena()
+        canvas.create_dot_arena(5, 5)
+        canvas.render_frame()
+        assert sum(r.w * r.h for r in canvas.updates[-1]) >= screen_area
+
+        canvas.create_arena_span(10, 2, 8)
+        canvas.create_line_arena(20, 1, 20, 12)
+        canvas.render_arena()
+        assert pygame.image.tobytes(canvas.screen, "RGB") == self.composite(canvas)
+        canvas.create_dot_arena(6, 5)
+        canvas.render_frame()
+        assert 0 < sum(r.w * r.h for r in canvas.updates[-1]) < screen_area // 10
+
+        # Discarding the path being drawn uncovers the arena under it
+        canvas.create_new_drawing_surface()
+        canvas.render_arena()
+        assert pygame.image.tobytes(canvas.screen, "RGB") == self.composite(canvas)
+
+    def test_other_screens_and_new_levels_are_shown_whole(self, canvas):
+        canvas.render_arena()
+        canvas.render_frame()
+        canvas.screen.fill((0, 0, 0))  # e.g. the title screen
+        canvas.render_frame()
+        assert canvas.updates[-1] is None
+        canvas.render_arena()
+        canvas.render_frame()
+        assert canvas.updates[-1] == [canvas.screen.get_rect()]
+        canvas.configure(30, 20)
+        canvas.render_arena()
+        canvas.render_frame()
+        assert canvas.updates[-1] == [canvas.screen.get_rect()]
+
+    def test_full_redraw_mode_flips_every_frame(self, canvas):
+        canvas.dirty_rects = False
+        for _ in range(2):
+            canvas.render_arena()
+            canvas.create_dot_arena(5, 5)
+            canvas.render_frame()
+        assert canvas.updates == [None, None]